@@ -1,18 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response # type: ignore
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 import libvirt # type: ignore
 import logging
-from src.services.disk_attach import attach_disk
-from src.services.disk_detach import detach_disk
-from src.utils.constants import COMMON_API_RESPONSES
-from src.utils.libvirt_utils import get_connection_dependency, get_next_available_scsi_dev
+from src.services.disk_attach import attach_disk_group, attach_disks
+from src.services.disk_detach import detach_disk, detach_disks
+from src.utils.constants import COMMON_API_RESPONSES, SUCCESS_BODY
+from src.utils.libvirt_utils import get_connection_dependency, get_connection_pool
+from src.utils.libvirt_cache import get_domain
+from src.utils.batcher import KeyedBatcher
+from src.utils.singleflight import SingleFlight
 from src.utils.validation_utils import validate_name
-from src.utils.exceptions import DiskNotFound
-from src.services.disk_utils import list_vm_disks
+from src.utils.exceptions import DiskNotFound, VMNotRunning
+from src.services.disk_utils import ensure_vm_running, list_vm_disks
 from src.utils.config import config
 from src.schemas.attach_disk_request import AttachDiskRequest
 from src.schemas.detach_disk_request import DetachDiskRequest
+from src.schemas.batch_disk_request import BatchAttachDiskRequest, BatchDetachDiskRequest
 
 logger: logging.Logger = logging.getLogger(__name__)
+
+# Fixed-shape success body, encoded once instead of per response
+_ATTACH_SUCCESS_BODY: bytes = b'{"status":"success","target_dev":"%b"}'
+
+# Coalesces overlapping list requests for the same VM into one libvirt read
+_list_singleflight = SingleFlight()
+
+# Groups single attach requests for the same VM that arrive close together, so
+# they share one XML read and device allocation and do not race for a device
+_attach_batcher = KeyedBatcher(config.DISK_ATTACH_COALESCE_WINDOW, config.DISK_ATTACH_COALESCE_MAX)
+
+async def _attach_coalesced(vm_name: str, qcow2_paths: list[str]) -> list:
+    """Attach a group of coalesced requests; per request the target device or the error to raise."""
+    # The batch outlives the request that opened it, so it does not use that
+    # request's connection or domain handle
+    pool = get_connection_pool()
+    conn: libvirt.virConnect = await pool.acquire_async()
+    try:
+        dom = await run_in_threadpool(get_domain, conn, vm_name)
+        # A path requested twice fails the second time, as it would in separate batches
+        outcomes = await run_in_threadpool(attach_disk_group, dom, qcow2_paths)
+    finally:
+        await pool.release_async(conn)
+    results: list = []
+    for target_dev, outcome in outcomes:
+        if outcome is True:
+            results.append(target_dev)
+        elif outcome is False:
+            results.append(HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                         detail="Failed to attach disk"))
+        else:
+            results.append(outcome)
+    return results
+
 router = APIRouter(
     prefix=config.DISK_ROUTER_PREFIX, 
     tags=["disk"],
@@ -25,7 +64,8 @@ router = APIRouter(
            summary="List VM disks",
            description="List all file-backed disks attached to a virtual machine",
            )
-async def list_disks_endpoint(vm_name: str, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+async def list_disks_endpoint(vm_name: str, background_tasks: BackgroundTasks,
+                              conn: libvirt.virConnect = Depends(get_connection_dependency)):
     """
     List all disks attached to a virtual machine.
     
@@ -42,30 +82,31 @@ async def list_disks_endpoint(vm_name: str, conn: libvirt.virConnect = Depends(g
         HTTPException: 400 for invalid VM name, 404 for VM not found, 
                       500 for server errors
     """
-    logger.info(f"Disk list request for VM: {vm_name}")
+    logger.debug("Disk list request for VM: %s", vm_name)
 
     # Validate VM name format
     try:
         validate_name(vm_name)
     except ValueError as e:
-        logger.error(f"Invalid VM name: {e}")
+        logger.error("Invalid VM name: %s", e)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    dom = conn.lookupByName(vm_name)
-    logger.info(f"Successfully connected to VM '{vm_name}'")
+    dom = await run_in_threadpool(get_domain, conn, vm_name)
 
-    disks = list_vm_disks(dom)
+    disks = await _list_singleflight.do(("list", vm_name), lambda: run_in_threadpool(list_vm_disks, dom))
 
-    logger.info(f"Successfully listed {len(disks)} disks for VM '{vm_name}'")
+    # Success records are written after the response is sent
+    background_tasks.add_task(logger.info, "Successfully listed %d disks for VM '%s'", len(disks), vm_name)
     return {"vm_name": vm_name, "disks": disks}
 
 @router.post("/attach",
             summary="Attach disk to VM",
             description="Attach a QCOW2 disk to a running virtual machine with automatic device assignment",
             responses={
-                409: {"description": "Device already in use or disk already attached"},
+                409: {"description": "VM not running, device already in use or disk already attached"},
             })
-async def attach_disk_endpoint(request: AttachDiskRequest, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+async def attach_disk_endpoint(request: AttachDiskRequest, background_tasks: BackgroundTasks,
+                               conn: libvirt.virConnect = Depends(get_connection_dependency)):
     """
     Attach a QCOW2 disk to a running virtual machine.
     
@@ -84,36 +125,44 @@ async def attach_disk_endpoint(request: AttachDiskRequest, conn: libvirt.virConn
         HTTPException: 400 for invalid input, 404 for VM not found, 
                       409 for conflicts, 500 for server errors
     """
-    logger.info(f"Disk attach request - VM: {request.vm_name}, Path: {request.qcow2_path}")
+    logger.debug("Disk attach request - VM: %s, Path: %s", request.vm_name, request.qcow2_path)
     
     try:
-        dom = conn.lookupByName(request.vm_name)
-        logger.info(f"Successfully connected to VM '{request.vm_name}'")
+        dom = await run_in_threadpool(get_domain, conn, request.vm_name)
+        # Fail fast instead of letting libvirt reject the hot-plug
+        await run_in_threadpool(ensure_vm_running, dom)
         
         # TODO: add an optional target dev parameter to the request
-        # TODO: move the logic for getting next available device to the service layer
-        target_dev: str = get_next_available_scsi_dev(dom)
-        logger.info(f"Auto-assigned target device: {target_dev}")
-        
-        success = attach_disk(dom, request.qcow2_path, target_dev)
+        # Devices are allocated in the service layer, together with any
+        # concurrent attach requests for the same VM
+        target_dev: str = await _attach_batcher.submit(
+            request.vm_name, request.qcow2_path, lambda qcow2_paths: _attach_coalesced(request.vm_name, qcow2_paths))
+        logger.debug("Auto-assigned target device: %s", target_dev)
         
-        if success:
-            logger.info(f"Successfully attached disk '{request.qcow2_path}' as '{target_dev}' to VM '{request.vm_name}'")
-            return {"status": "success", "target_dev": target_dev}
-        else:
-            logger.error(f"Failed to attach disk '{request.qcow2_path}' to VM '{request.vm_name}'")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                              detail="Failed to attach disk")
+        background_tasks.add_task(logger.info, "Successfully attached disk '%s' as '%s' to VM '%s'",
+                                  request.qcow2_path, target_dev, request.vm_name)
+        # target_dev comes from the SCSI allocator (sd + lowercase letters), so it needs no escaping
+        return Response(content=_ATTACH_SUCCESS_BODY % target_dev.encode(), media_type="application/json")
             
+    except VMNotRunning as e:
+        logger.error("Disk attach rejected: %s", e)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
-        logger.error(f"Validation error during disk attach: {e}")
+        logger.error("Validation error during disk attach: %s", e)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e: # No free target device or attachment not confirmed
+        logger.error("Runtime error during disk attach: %s", e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
+                          detail=str(e))
 
 @router.post("/detach", 
             summary="Detach disk from VM",
             description="Detach a disk from a running virtual machine by target device name",
-            )
-async def detach_disk_endpoint(request: DetachDiskRequest, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+            responses={
+                409: {"description": "VM not running"},
+            })
+async def detach_disk_endpoint(request: DetachDiskRequest, background_tasks: BackgroundTasks,
+                               conn: libvirt.virConnect = Depends(get_connection_dependency)):
     """
     Detach a disk from a running virtual machine.
     
@@ -130,27 +179,107 @@ async def detach_disk_endpoint(request: DetachDiskRequest, conn: libvirt.virConn
         
     Raises:
         HTTPException: 400 for invalid input, 404 for VM/disk not found, 
-                      500 for server errors
+                      409 for VM not running, 500 for server errors
     """
-    logger.info(f"Disk detach request - VM: {request.vm_name}, Target: {request.target_dev}")
+    logger.debug("Disk detach request - VM: %s, Target: %s", request.vm_name, request.target_dev)
     
     try:
-        success = detach_disk(conn, request.vm_name, request.target_dev)
+        success = await run_in_threadpool(detach_disk, conn, request.vm_name, request.target_dev)
         
         if success:
-            logger.info(f"Successfully detached disk '{request.target_dev}' from VM '{request.vm_name}'")
-            return {"status": "success"}
+            background_tasks.add_task(logger.info, "Successfully detached disk '%s' from VM '%s'",
+                                      request.target_dev, request.vm_name)
+            return Response(content=SUCCESS_BODY, media_type="application/json")
         else:
-            logger.error(f"Failed to detach disk '{request.target_dev}' from VM '{request.vm_name}'")
+            logger.error("Failed to detach disk '%s' from VM '%s'", request.target_dev, request.vm_name)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
                               detail="Failed to detach disk")
             
     except DiskNotFound as e:
-        logger.error(f"Disk not found during detach: {e}")
+        logger.error("Disk not found during detach: %s", e)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except VMNotRunning as e:
+        logger.error("Disk detach rejected: %s", e)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e: # Catches other validation errors
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except RuntimeError as e: # Catches timeout errors
-        logger.error(f"Runtime error during disk detach: {e}")
+        logger.error("Runtime error during disk detach: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                          detail=str(e))
\ No newline at end of file
+                          detail=str(e))
+
+@router.post("/attach_batch",
+            summary="Attach several disks to VM",
+            description="Attach multiple QCOW2 disks to a running virtual machine in one request",
+            responses={
+                409: {"description": "VM not running"},
+            })
+async def attach_disk_batch_endpoint(request: BatchAttachDiskRequest, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+    """
+    Attach several QCOW2 disks to a running virtual machine.
+    
+    The VM is looked up once and target devices for all disks are assigned
+    from a single read of its configuration. Each disk is then attached in
+    order; a failure of one disk does not stop the others.
+    
+    Args:
+        request: BatchAttachDiskRequest containing:
+            - vm_name: Name of the target VM (alphanumeric, hyphens, underscores only)
+            - disks: List of disks, each with qcow2_path and disk_name
+    
+    Returns:
+        dict: VM name and per-disk results (status and assigned target device)
+        
+    Raises:
+        HTTPException: 400 for invalid input or not enough free devices,
+                      404 for VM not found, 409 for VM not running,
+                      500 for server errors
+    """
+    logger.debug("Batch disk attach request - VM: %s, Disks: %d", request.vm_name, len(request.disks))
+    
+    try:
+        dom = await run_in_threadpool(get_domain, conn, request.vm_name)
+        await run_in_threadpool(ensure_vm_running, dom)
+        qcow2_paths: list[str] = [disk.qcow2_path for disk in request.disks]
+        results: list[dict] = await run_in_threadpool(attach_disks, dom, qcow2_paths)
+        return {"vm_name": request.vm_name, "results": results}
+    except VMNotRunning as e:
+        logger.error("Batch disk attach rejected: %s", e)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except RuntimeError as e:
+        logger.error("Batch disk attach failed for VM '%s': %s", request.vm_name, e)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/detach_batch",
+            summary="Detach several disks from VM",
+            description="Detach multiple disks from a running virtual machine by target device name in one request",
+            responses={
+                409: {"description": "VM not running"},
+            })
+async def detach_disk_batch_endpoint(request: BatchDetachDiskRequest, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+    """
+    Detach several disks from a running virtual machine.
+    
+    The VM is looked up once and each disk is detached in order; a failure
+    of one disk does not stop the others.
+    
+    Args:
+        request: BatchDetachDiskRequest containing:
+            - vm_name: Name of the target VM (alphanumeric, hyphens, underscores only)
+            - target_devs: Device names to detach (format: [vs]d[a-z]+)
+    
+    Returns:
+        dict: VM name and per-disk results
+        
+    Raises:
+        HTTPException: 400 for invalid input, 404 for VM not found,
+                      409 for VM not running
+    """
+    logger.debug("Batch disk detach request - VM: %s, Targets: %s", request.vm_name, request.target_devs)
+    
+    try:
+        results: list[dict] = await run_in_threadpool(detach_disks, conn, request.vm_name, request.target_devs)
+        return {"vm_name": request.vm_name, "results": results}
+    except VMNotRunning as e:
+        logger.error("Batch disk detach rejected: %s", e)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException # type: ignore
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 import libvirt # type: ignore
 import logging
 from src.schemas.create_vm_request import CreateVMRequest
 from src.utils.libvirt_utils import get_connection_dependency
+from src.utils.libvirt_cache import get_domain
 from src.services.vm_services import create_vm, delete_vm, get_vm_info, start_vm, stop_vm, list_vms
 from src.utils.config import config
-from src.utils.constants import COMMON_API_RESPONSES
+from src.utils.constants import COMMON_API_RESPONSES, SUCCESS_BODY
 
 logger: logging.Logger = logging.getLogger(__name__)
 router = APIRouter(
@@ -37,24 +39,21 @@ async def get_vm_info_endpoint(vm_name: str, conn: libvirt.virConnect = Depends(
         HTTPException: 404 if the VM is not found.
         HTTPException: 500 for server errors
     """
-    try:
-        domain = conn.lookupByName(vm_name)
-        if domain is None:
-            raise HTTPException(status_code=404, detail="VM not found")
-
-        info = get_vm_info(vm_name, conn)
-        return {
-            "name": info["name"],
-            "uuid": info["uuid"],
-            "state": info["state"],
-            "memory": info["memory"],
-            "vcpu_count": info["vcpu_count"],
-            "disks": info["disks"],
-            "network_name": info["network_name"],
-        }
-    except libvirt.libvirtError as e:
-        logger.error(f"Libvirt error while getting VM info: {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
+    # libvirt errors (e.g. VM not found) are mapped by the global libvirt error handler
+    domain = await run_in_threadpool(get_domain, conn, vm_name)
+    if domain is None:
+        raise HTTPException(status_code=404, detail="VM not found")
+
+    info = await run_in_threadpool(get_vm_info, vm_name, conn)
+    return {
+        "name": info["name"],
+        "uuid": info["uuid"],
+        "state": info["state"],
+        "memory": info["memory"],
+        "vcpu_count": info["vcpu_count"],
+        "disks": info["disks"],
+        "network_name": info["network_name"],
+    }
 
 @router.get("/list",
             summary="List all virtual machines",
@@ -75,12 +74,8 @@ async def list_vms_endpoint(conn: libvirt.virConnect = Depends(get_connection_de
     Raises:
         HTTPException: 500 for server errors
     """
-    try:
-        vms: list = list_vms(conn)
-        return {"vms": vms}
-    except libvirt.libvirtError as e:
-        logger.error(f"Libvirt error while listing VMs: {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
+    vms: list = await run_in_threadpool(list_vms, conn)
+    return {"vms": vms}
 
 @router.post("/create",
              summary="Create a new virtual machine",
@@ -89,7 +84,8 @@ async def list_vms_endpoint(conn: libvirt.virConnect = Depends(get_connection_de
                  409: {"description": "VM already exists or disk already attached"},
              },
              status_code=201)
-async def create_vm_endpoint(request: CreateVMRequest, conn: libvirt.virConnect = Depends(get_connection_dependency)):
+async def create_vm_endpoint(request: CreateVMRequest, background_tasks: BackgroundTasks,
+                             conn: libvirt.virConnect = Depends(get_connection_dependency)):
     """
     Create a new virtual machine with specified parameters.
     
@@ -109,23 +105,22 @@ async def create_vm_endpoint(request: CreateVMRequest, conn: libvirt.virConnect
     Raises:
         HTTPException: 400 for invalid input, 409 for conflicts, 500 for server errors
     """
-    logger.info(f"VM creation request - Name: {request.vm_name}, Memory: {request.memory_mb}MB, VCPUs: {request.vcpu_count}, Disk: {request.disk_path}, Network: {request.network_name}")
+    logger.info("VM creation request - Name: %s, Memory: %sMB, VCPUs: %s, Disk: %s, Network: %s",
+                request.vm_name, request.memory_mb, request.vcpu_count, request.disk_path, request.network_name)
     
     try:
         # Create the VM using the service function
-        uuid = create_vm(request.vm_name, request.memory_mb, request.vcpu_count, request.disk_path, request.network_name, conn)
+        uuid = await run_in_threadpool(create_vm, request.vm_name, request.memory_mb, request.vcpu_count, request.disk_path, request.network_name, conn)
         
-        logger.info(f"VM '{request.vm_name}' created successfully with UUID: {uuid}")
+        # Logged after the response is sent
+        background_tasks.add_task(logger.info, "VM '%s' created successfully with UUID: %s", request.vm_name, uuid)
         return {"status": "success", "uuid": uuid}
     
     except ValueError as e:
-        logger.error(f"Validation error during VM creation: {e}")
+        logger.error("Validation error during VM creation: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except libvirt.libvirtError as e:
-        logger.error(f"Libvirt error during VM creation: {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
-    except Exception as e:
-        logger.error(f"Unexpected error during VM creation: {repr(e)}", exc_info=True)
+        logger.error("Libvirt error during VM creation: %r", e, exc_info=True)
         raise HTTPException(status_code=500)
 
 @router.post("/start/{vm_name}",
@@ -146,17 +141,9 @@ async def start_vm_endpoint(vm_name: str, conn = Depends(get_connection_dependen
     Raises:
         HTTPException: 404 for not found, 500 for server errors
     """
-    try:
-        if start_vm(vm_name, conn):
-            return {"status": "success"}
-        else:
-            raise HTTPException(status_code=404)
-    except HTTPException as http_exc:
-        # Re-raise HTTPExceptions (such as 404) so FastAPI can handle them properly
-        raise http_exc
-    except Exception as e:
-        logger.error(f"Error starting VM '{vm_name}': {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
+    if await run_in_threadpool(start_vm, vm_name, conn):
+        return Response(content=SUCCESS_BODY, media_type="application/json")
+    raise HTTPException(status_code=404)
     
 @router.post("/stop/{vm_name}",
              summary="Stop a virtual machine",
@@ -176,17 +163,9 @@ async def stop_vm_endpoint(vm_name: str, conn = Depends(get_connection_dependenc
     Raises:
         HTTPException: 404 for not found, 500 for server errors
     """
-    try:
-        if stop_vm(vm_name, conn):
-            return {"status": "success"}
-        else:
-            raise HTTPException(status_code=404)
-    except HTTPException as http_exc:
-        # Re-raise HTTPExceptions (such as 404) so FastAPI can handle them properly
-        raise http_exc
-    except Exception as e:
-        logger.error(f"Error stopping VM '{vm_name}': {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
+    if await run_in_threadpool(stop_vm, vm_name, conn):
+        return Response(content=SUCCESS_BODY, media_type="application/json")
+    raise HTTPException(status_code=404)
 
 @router.delete("/delete/{vm_name}",
                summary="Delete a virtual machine",
@@ -206,14 +185,6 @@ async def delete_vm_endpoint(vm_name: str, conn = Depends(get_connection_depende
     Raises:
         HTTPException: 404 for not found, 500 for server errors
     """
-    try:
-        if delete_vm(vm_name, conn):
-            return {"status": "success"}
-        else:
-            raise HTTPException(status_code=404)
-    except HTTPException as http_exc:
-        # Re-raise HTTPExceptions (such as 404) so FastAPI can handle them properly
-        raise http_exc
-    except Exception as e:
-        logger.error(f"Error deleting VM '{vm_name}': {repr(e)}", exc_info=True)
-        raise HTTPException(status_code=500)
\ No newline at end of file
+    if await run_in_threadpool(delete_vm, vm_name, conn):
+        return Response(content=SUCCESS_BODY, media_type="application/json")
+    raise HTTPException(status_code=404)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 import libvirt # type: ignore
 import logging
 from src.utils.exceptions import VolumeInUseError
@@ -37,10 +38,12 @@ async def create_volume_endpoint(
     Returns:
         dict: Success status and the full path of the created volume.
     """
-    logger.info(f"Disk volume creation request - Pool: {pool_name}, Name: {volume_name}, Size: {request.size_gb}GB")
+    logger.info("Disk volume creation request - Pool: %s, Name: %s, Size: %sGB", pool_name, volume_name, request.size_gb)
     try:
         # The service layer returns the full, correct path. Do not modify it.
-        volume_path = create_volume(conn, volume_name, int(request.size_gb), pool_name)
+        volume_path = await run_in_threadpool(create_volume, conn, volume_name, int(request.size_gb), pool_name,
+                                              backing_vol_name=request.backing_vol_name,
+                                              backing_format=request.backing_format)
         return {"status": "success", "volume_path": volume_path}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -51,7 +54,7 @@ async def create_volume_endpoint(
                 status_code=status.HTTP_409_CONFLICT,
                 detail=f"Storage volume '{volume_name}' already exists in pool '{pool_name}'."
             )
-        logger.error(f"Libvirt error during volume creation: {e}")
+        logger.error("Libvirt error during volume creation: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @router.delete("/delete/{volume_name}",
@@ -68,9 +71,9 @@ async def delete_volume_endpoint(
     """
     Delete a disk (storage volume) from the libvirt host. This is idempotent.
     """
-    logger.info(f"Disk volume deletion request - Pool: {pool_name}, Name: {volume_name}")
+    logger.info("Disk volume deletion request - Pool: %s, Name: %s", pool_name, volume_name)
     try:
-        delete_volume(conn, pool_name, volume_name)
+        await run_in_threadpool(delete_volume, conn, pool_name, volume_name)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except VolumeInUseError as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
@@ -91,10 +94,10 @@ async def list_volumes_endpoint(pool_name: str, conn: libvirt.virConnect = Depen
     Returns:
         dict: A list of volumes in the specified pool.
     """
-    logger.info(f"Disk volume list request - Pool: {pool_name}")
+    logger.info("Disk volume list request - Pool: %s", pool_name)
     try:
-        volumes = list_volumes(conn, pool_name)
+        volumes = await run_in_threadpool(list_volumes, conn, pool_name)
         return {"volumes": volumes}
     except libvirt.libvirtError as e:
-        logger.error(f"Libvirt error during volume list: {e}")
+        logger.error("Libvirt error during volume list: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,10 +1,19 @@
+import asyncio
 import logging
+import orjson # type: ignore
+from contextlib import asynccontextmanager
 import libvirt # type: ignore
 import uvicorn # type: ignore
-from fastapi import FastAPI # type: ignore
+from anyio import to_thread # type: ignore
+from fastapi import FastAPI, Request, Response # type: ignore
+from fastapi.responses import ORJSONResponse # type: ignore
+from starlette.routing import Route # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
 from src.api import disk_endpoints, vm_endpoints, volume_endpoints
 from src.utils.config import config
-from src.utils.exception_handlers import libvirt_error_handler
+from src.utils.exception_handlers import libvirt_error_handler, unhandled_exception_handler
+from src.utils.libvirt_utils import close_connection_pool, get_connection_pool, maintain_connection_pool
+from src.utils.libvirt_events import start_event_loop
 
 # Configure logging
 logging.basicConfig(
@@ -14,24 +23,65 @@ logging.basicConfig(
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+async def _pool_keepalive(interval: float) -> None:
+    """Periodically evict stale pooled libvirt connections."""
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(maintain_connection_pool)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks."""
+    # Every libvirt call runs in this threadpool, so it bounds request concurrency
+    if config.THREADPOOL_SIZE > 0:
+        to_thread.current_default_thread_limiter().total_tokens = config.THREADPOOL_SIZE
+    # Register the libvirt event loop before any connection is opened
+    start_event_loop()
+    # One pool per worker process, filled to its minimum size before the first request
+    get_connection_pool()
+    await run_in_threadpool(maintain_connection_pool)
+    keepalive: asyncio.Task | None = None
+    if config.LIBVIRT_POOL_KEEPALIVE_INTERVAL > 0:
+        keepalive = asyncio.create_task(_pool_keepalive(config.LIBVIRT_POOL_KEEPALIVE_INTERVAL))
+    yield
+    if keepalive is not None:
+        keepalive.cancel()
+    logger.info("Shutting down, closing libvirt connection pool")
+    close_connection_pool()
+
 app: FastAPI = FastAPI(
     title=config.APP_TITLE, 
     version=config.APP_VERSION,
-    debug=config.DEBUG
+    debug=config.DEBUG,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Register the custom exception handler for all libvirt errors
 app.add_exception_handler(libvirt.libvirtError, libvirt_error_handler)
+# Anything else ends up here instead of per-endpoint catch-all blocks
+app.add_exception_handler(Exception, unhandled_exception_handler)
 
 app.include_router(volume_endpoints.router, prefix=config.API_PREFIX)
 app.include_router(vm_endpoints.router, prefix=config.API_PREFIX)
 app.include_router(disk_endpoints.router, prefix=config.API_PREFIX)
 
-@app.get("/health")
-async def health_check():
+# The health response never changes while the process runs; it is built once and reused
+_HEALTH_RESPONSE: Response = Response(
+    content=orjson.dumps({"status": "healthy", "version": config.APP_VERSION}),
+    media_type="application/json",
+)
+
+async def health_check(request: Request) -> Response:
     """Health check endpoint for container orchestration."""
-    return {"status": "healthy", "version": config.APP_VERSION}
+    return _HEALTH_RESPONSE
+
+# Plain Starlette route (no FastAPI request parsing or dependencies), matched
+# before every API route since orchestrators poll it constantly
+app.router.routes.insert(0, Route("/health", health_check, methods=["GET"], include_in_schema=False))
 
 if __name__ == "__main__":
-    logger.info(f"Starting server on {config.HOST}:{config.PORT}, debug={config.DEBUG}")
-    uvicorn.run(app, host=config.HOST, port=config.PORT, debug=config.DEBUG)
\ No newline at end of file
+    logger.info("Starting server on %s:%s, debug=%s, workers=%s", config.HOST, config.PORT, config.DEBUG, config.WEB_CONCURRENCY)
+    # Import string so each worker process imports the app (and creates its own pool).
+    # The default loop/http "auto" settings pick uvloop and httptools, which uvicorn[standard] installs.
+    uvicorn.run("src.main:app", host=config.HOST, port=config.PORT, workers=config.WEB_CONCURRENCY)
\ No newline at end of file
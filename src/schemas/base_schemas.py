@@ -1,27 +1,47 @@
-from pydantic import BaseModel, Field, field_validator # type: ignore
-from src.utils.validation_utils import validate_name
+from typing import Annotated
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field # type: ignore
+from src.utils.validation_utils import validate_name, validate_qcow2_path, validate_target_device
+
+# validate_name takes the name of the field for its messages. The wrappers take
+# a single argument: a second positional parameter would make pydantic pass
+# ValidationInfo as type_name.
+def _validate_disk_name(value: str) -> str:
+    return validate_name(value)
+
+def _validate_vm_name(value: str) -> str:
+    return validate_name(value, "VM name")
+
+def _validate_pool_name(value: str) -> str:
+    return validate_name(value, "Storage pool name")
+
+def _validate_volume_name(value: str) -> str:
+    return validate_name(value, "Volume name")
+
+def _validate_network_name(value: str) -> str:
+    if not value.isidentifier():
+        raise ValueError('Network name must be a valid identifier')
+    return value
+
+# Field types shared by the request models. The checks run as plain functions
+# after pydantic-core's own string validation, without a classmethod per model.
+Qcow2Path = Annotated[str, Field(min_length=1), AfterValidator(validate_qcow2_path)]
+DiskName = Annotated[str, Field(min_length=1), AfterValidator(_validate_disk_name)]
+TargetDevice = Annotated[str, Field(min_length=1), AfterValidator(validate_target_device)]
+VMName = Annotated[str, Field(min_length=1, max_length=255), AfterValidator(_validate_vm_name)]
+StoragePoolName = Annotated[str, AfterValidator(_validate_pool_name)]
+VolumeName = Annotated[str, AfterValidator(_validate_volume_name)]
+NetworkName = Annotated[str, Field(min_length=1), AfterValidator(_validate_network_name)]
 
 class BaseVMRequest(BaseModel):
     """Base request model for virtual machine operations."""
-    vm_name: str = Field(..., description="Name of the virtual machine", min_length=1, max_length=255)
+    # Requests are read-only once validated
+    model_config = ConfigDict(frozen=True)
 
-    @field_validator('vm_name')
-    @classmethod
-    def validate_name(cls, value: str) -> str:
-        """Validate the VM name."""
-        return validate_name(value, "VM name")
+    vm_name: VMName = Field(..., description="Name of the virtual machine")
     
 class BaseVolumeRequest(BaseModel):
     """Base request model for volume operations."""
-    pool_name: str = Field(..., description="The name of the storage pool where the volume is located (e.g., 'default').")
-    volume_name: str = Field(..., description="The name of the volume to delete.")
-
-    @field_validator('pool_name')
-    @classmethod
-    def validate_name(cls, value):
-        return validate_name(value, "Storage pool name")
-
-    @field_validator('volume_name')
-    @classmethod
-    def validate_volume_name(cls, value):
-        return validate_name(value, "Volume name")
\ No newline at end of file
+    model_config = ConfigDict(frozen=True)
+
+    pool_name: StoragePoolName = Field(..., description="The name of the storage pool where the volume is located (e.g., 'default').")
+    volume_name: VolumeName = Field(..., description="The name of the volume to delete.")
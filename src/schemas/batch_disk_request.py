@@ -0,0 +1,31 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator # type: ignore
+from src.schemas.base_schemas import BaseVMRequest, DiskName, Qcow2Path, TargetDevice
+
+class DiskSpec(BaseModel):
+    """A single disk of a batch attachment."""
+    model_config = ConfigDict(frozen=True)
+
+    qcow2_path: Qcow2Path = Field(..., description="Path to the QCOW2 disk image")
+    disk_name: DiskName = Field(..., description="Name of the disk within the VM")
+
+class BatchAttachDiskRequest(BaseVMRequest):
+    """Request model for attaching several disks to one VM."""
+    disks: list[DiskSpec] = Field(..., description="Disks to attach, in order", min_length=1)
+
+    @field_validator('disks')
+    @classmethod
+    def validate_unique_disks_field(cls, v: list[DiskSpec]) -> list[DiskSpec]:
+        if len({disk.qcow2_path for disk in v}) != len(v):
+            raise ValueError("Each qcow2_path may only be listed once")
+        return v
+
+class BatchDetachDiskRequest(BaseVMRequest):
+    """Request model for detaching several disks from one VM."""
+    target_devs: list[TargetDevice] = Field(..., description="Target device names to detach", min_length=1)
+
+    @field_validator('target_devs')
+    @classmethod
+    def validate_unique_target_devs_field(cls, v: list[str]) -> list[str]:
+        if len(set(v)) != len(v):
+            raise ValueError("Each target device may only be listed once")
+        return v
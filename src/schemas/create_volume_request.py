@@ -1,13 +1,25 @@
-from dataclasses import Field
-from pydantic import BaseModel, Field, field_validator # type: ignore
-import libvirt # type: ignore
-from src.utils.validation_utils import validate_size_gb
+from typing import Annotated, Optional
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field # type: ignore
+from src.utils.validation_utils import validate_name, validate_size_gb
+
+# Image formats libvirt can use as a backing store for a new qcow2 volume
+BACKING_FORMATS: frozenset[str] = frozenset(("qcow2", "raw"))
+
+def _validate_backing_vol_name(value: str) -> str:
+    return validate_name(value, "Backing volume name")
+
+def _validate_backing_format(value: str) -> str:
+    if value not in BACKING_FORMATS:
+        raise ValueError(f"Backing format must be one of: {', '.join(sorted(BACKING_FORMATS))}")
+    return value
 
 class CreateVolumeRequest(BaseModel):
     """Request model for creating a new disk volume in a storage pool."""
-    size_gb: int = Field(..., description="The size of the volume to create (in GB).")
-    
-    @field_validator('size_gb')
-    @classmethod
-    def validate_size_gb(cls, value):
-        return validate_size_gb(value)
+    model_config = ConfigDict(frozen=True)
+
+    size_gb: Annotated[int, AfterValidator(validate_size_gb)] = Field(..., description="The size of the volume to create (in GB).")
+    # None skips the name check
+    backing_vol_name: Optional[Annotated[str, AfterValidator(_validate_backing_vol_name)]] = Field(
+        None, description="Volume in the same pool to use as a copy-on-write base image.")
+    backing_format: Annotated[str, AfterValidator(_validate_backing_format)] = Field(
+        "qcow2", description="Format of the backing volume (qcow2 or raw).")
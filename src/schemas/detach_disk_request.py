@@ -1,12 +1,6 @@
-from pydantic import BaseModel, Field, field_validator # type: ignore
-from src.utils.validation_utils import validate_target_device
-from src.schemas.base_schemas import BaseVMRequest
+from pydantic import Field # type: ignore
+from src.schemas.base_schemas import BaseVMRequest, TargetDevice
 
 class DetachDiskRequest(BaseVMRequest):
     """Request model for disk detachment."""
-    target_dev: str = Field(..., description="Target device name to detach", min_length=1)
-
-    @field_validator('target_dev')
-    @classmethod
-    def validate_target_dev_field(cls, v: str) -> str:
-        return validate_target_device(v)
\ No newline at end of file
+    target_dev: TargetDevice = Field(..., description="Target device name to detach")
@@ -1,73 +1,175 @@
 import libvirt # type: ignore
+from lxml import etree # type: ignore
 import logging
-import time
-from src.services.disk_utils import _check_disk_conflicts, _create_disk_xml
-from src.utils.libvirt_utils import parse_domain_xml
+from typing import Optional
+from src.services.disk_utils import _check_disk_conflicts, _create_disk_xml, _find_disk
+from src.utils.libvirt_utils import get_next_available_scsi_devs
+from src.utils.domain_xml_cache import parse_domain_xml
+from src.utils.libvirt_events import DeviceEventWaiter
 from src.utils.config import config
-from src.utils.validation_utils import validate_qcow2_path
 
 logger: logging.Logger = logging.getLogger(__name__)
 
-def _confirm_attachment(dom: libvirt.virDomain, qcow2_path: str, target_dev: str) -> bool:
-    """Confirm disk attachment by polling VM configuration."""
+def _is_disk_live(dom: libvirt.virDomain, qcow2_path: str, target_dev: str) -> bool:
+    """
+    Check whether a disk image is attached to the running VM.
+
+    blockInfo on the source path succeeds only once the image is live-attached,
+    so no domain XML has to be fetched or parsed. Falls back to the live XML
+    if blockInfo fails for any other reason than an unknown disk.
+    """
+    try:
+        dom.blockInfo(qcow2_path)
+        return True
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_INVALID_ARG:
+            return False  # Not attached (yet)
+        logger.debug("blockInfo failed for '%s', checking the live XML: %s", qcow2_path, e)
+
+    root = parse_domain_xml(dom, live=True)
+    disk = _find_disk(root, target_dev)
+    source = disk.find("source") if disk is not None else None
+    return source is not None and source.get('file') == qcow2_path
+
+def _confirm_attachment(dom: libvirt.virDomain, qcow2_path: str, target_dev: str, waiter: DeviceEventWaiter) -> bool:
+    """Confirm disk attachment by checking the live block devices, waking early on device-added events."""
     vm_name = dom.name()
-    logger.debug(f"Starting attachment confirmation for VM '{vm_name}', device '{target_dev}'")
+    logger.debug("Starting attachment confirmation for VM '%s', device '%s'", vm_name, target_dev)
     
-    for attempt in range(config.DISK_ATTACH_CONFIRM_RETRIES):
-        logger.debug(f"Confirmation attempt {attempt + 1}/{config.DISK_ATTACH_CONFIRM_RETRIES}")
-        root = parse_domain_xml(dom, live=True)
-        
-        for disk in root.findall(".//devices/disk"):
-            target = disk.find("target")
-            source = disk.find("source")
-            if (target is not None and target.get('dev') == target_dev and
-                source is not None and source.get('file') == qcow2_path):
-                logger.info(f"Successfully confirmed disk attachment - VM: '{vm_name}', Device: '{target_dev}', Attempt: {attempt + 1}")
-                return True
+    # Config values are read from the environment on every access
+    retries: int = config.DISK_ATTACH_CONFIRM_RETRIES
+    delay: float = config.DISK_ATTACH_CONFIRM_DELAY
+    
+    for attempt in range(retries):
+        logger.debug("Confirmation attempt %d/%d", attempt + 1, retries)
+        if _is_disk_live(dom, qcow2_path, target_dev):
+            logger.info("Successfully confirmed disk attachment - VM: '%s', Device: '%s', Attempt: %s", vm_name, target_dev, attempt + 1)
+            return True
         
-        if attempt < config.DISK_ATTACH_CONFIRM_RETRIES - 1:
-            logger.debug(f"Attachment not confirmed, waiting {config.DISK_ATTACH_CONFIRM_DELAY}s")
-            time.sleep(config.DISK_ATTACH_CONFIRM_DELAY)
+        if attempt < retries - 1:
+            logger.debug("Attachment not confirmed, waiting %ss", delay)
+            waiter.wait(delay)
     
-    logger.error(f"Failed to confirm attachment after {config.DISK_ATTACH_CONFIRM_RETRIES} attempts")
+    logger.error("Failed to confirm attachment after %s attempts", retries)
     return False
 
-def attach_disk(dom: libvirt.virDomain, qcow2_path: str, target_dev: str) -> bool:
-    """Attach disk to running VM."""
+def attach_disk(dom: libvirt.virDomain, qcow2_path: str, target_dev: str,
+                root: Optional[etree._Element] = None) -> bool:
+    """
+    Attach disk to running VM, checking conflicts against root if it was already read.
+
+    Returns False if libvirt rejects the attachment; conflicts raise
+    ValueError and an unconfirmed attachment raises RuntimeError. Other
+    errors (e.g. reading the domain XML) propagate unchanged.
+    """
     vm_name: str = dom.name()
-    logger.info(f"Starting disk attachment - VM: '{vm_name}', Path: '{qcow2_path}', Target: '{target_dev}'")
+    logger.info("Starting disk attachment - VM: '%s', Path: '%s', Target: '%s'", vm_name, qcow2_path, target_dev)
     
-    # TODO: move the logic for getting next available device from endpoint to here
+    # Read the live XML once for the conflict pre-check
+    if root is None:
+        root = parse_domain_xml(dom, live=True)
+    # Raises ValueError if the target device is taken by another disk
+    if _check_disk_conflicts(dom, qcow2_path, target_dev, root=root):
+        return True  # Already attached
     
-    try:
-        # TODO: do we need this?
-        validate_qcow2_path(qcow2_path)
-        logger.debug(f"Disk file validation passed: {qcow2_path}")
-        
-        if _check_disk_conflicts(dom, qcow2_path, target_dev):
-            return True  # Already attached
-        
-        # Add custom metadata to the disk XML
-        disk_metadata: dict = {"status": "open for write"}
-        
-        disk_xml: str = _create_disk_xml(qcow2_path, target_dev, metadata=disk_metadata)
-        logger.debug(f"Attach disk XML:\n{disk_xml}")
-        
-        flags: int = libvirt.VIR_DOMAIN_AFFECT_LIVE | libvirt.VIR_DOMAIN_AFFECT_CONFIG
-        
-        logger.debug(f"Executing disk attachment with flags: {flags}")
-        dom.attachDeviceFlags(disk_xml, flags)
-        logger.info(f"Disk attachment command executed for VM '{vm_name}', device '{target_dev}'")
+    # Add custom metadata to the disk XML
+    disk_metadata: dict = {"status": "open for write"}
+    
+    disk_xml: str = _create_disk_xml(qcow2_path, target_dev, metadata=disk_metadata)
+    logger.debug("Attach disk XML:\n%s", disk_xml)
+    
+    flags: int = libvirt.VIR_DOMAIN_AFFECT_LIVE | libvirt.VIR_DOMAIN_AFFECT_CONFIG
+    
+    logger.debug("Executing disk attachment with flags: %s", flags)
+    with DeviceEventWaiter(dom, libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_ADDED) as waiter:
+        try:
+            dom.attachDeviceFlags(disk_xml, flags)
+        except libvirt.libvirtError as e:
+            logger.error("Disk attachment failed for VM '%s': %s", vm_name, e)
+            return False
+        logger.info("Disk attachment command executed for VM '%s', device '%s'", vm_name, target_dev)
         
-        if not _confirm_attachment(dom, qcow2_path, target_dev):
+        if not _confirm_attachment(dom, qcow2_path, target_dev, waiter):
             raise RuntimeError(f"Failed to confirm disk attachment after {config.DISK_ATTACH_CONFIRM_RETRIES} attempts")
-        
-        logger.info(f"Successfully attached disk '{qcow2_path}' as '{target_dev}' to VM '{vm_name}'")
-        return True
-        
-    except (ValueError, RuntimeError) as e:
-        logger.error(f"Disk attachment failed for VM '{vm_name}': {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error during disk attachment for VM '{vm_name}': {e}")
-        return False
\ No newline at end of file
+    
+    logger.info("Successfully attached disk '%s' as '%s' to VM '%s'", qcow2_path, target_dev, vm_name)
+    return True
+
+def attach_disk_group(dom: libvirt.virDomain, qcow2_paths: list[str]) -> list[tuple[str, bool | Exception]]:
+    """
+    Attach several disks to a running VM from a single read of the domain XML.
+
+    Target devices for all disks are allocated and checked for conflicts
+    against one read of the domain XML, then each disk is attached in order.
+    A failure of one disk does not stop the others. A path listed again after
+    it was attached gets the same conflict error as a later request would.
+
+    Args:
+        dom: libvirt Domain object
+        qcow2_paths: Paths of the QCOW2 disk images to attach
+
+    Returns:
+        list[tuple[str, bool | Exception]]: Per disk, the target device and
+            the outcome: True if attached, False if libvirt rejected it, or
+            the ValueError/RuntimeError/libvirtError that was raised
+
+    Raises:
+        RuntimeError: If there are not enough free target devices for all disks
+    """
+    # Allocation and the conflict checks of the whole group use this one tree;
+    # target devices are unique within a group, and disks attached by the
+    # group are tracked below, so it stays valid while the disks are attached.
+    root = parse_domain_xml(dom, live=True)
+    target_devs: list[str] = get_next_available_scsi_devs(dom, len(qcow2_paths), root=root)
+
+    attached: dict[str, str] = {}  # qcow2_path -> target device, for this group
+    outcomes: list[tuple[str, bool | Exception]] = []
+    for qcow2_path, target_dev in zip(qcow2_paths, target_devs):
+        try:
+            if qcow2_path in attached:
+                # Not in the shared tree yet; same error as _check_disk_conflicts
+                error_msg: str = f"Disk '{qcow2_path}' already attached as '{attached[qcow2_path]}'"
+                logger.error(error_msg)
+                raise ValueError(error_msg)
+            outcome: bool = attach_disk(dom, qcow2_path, target_dev, root=root)
+            if outcome:
+                attached[qcow2_path] = target_dev
+            outcomes.append((target_dev, outcome))
+        except (ValueError, RuntimeError, libvirt.libvirtError) as e:
+            outcomes.append((target_dev, e))
+    return outcomes
+
+def attach_disks(dom: libvirt.virDomain, qcow2_paths: list[str]) -> list[dict]:
+    """
+    Attach several disks to a running VM.
+
+    See attach_disk_group; a failure of one disk does not stop the others.
+
+    Args:
+        dom: libvirt Domain object
+        qcow2_paths: Paths of the QCOW2 disk images to attach
+
+    Returns:
+        list[dict]: Per-disk result with qcow2_path, target_dev, status and,
+            on failure, detail
+
+    Raises:
+        RuntimeError: If there are not enough free target devices for all disks
+    """
+    vm_name: str = dom.name()
+    logger.info("Starting batch disk attachment - VM: '%s', Disks: %s", vm_name, len(qcow2_paths))
+
+    results: list[dict] = []
+    for qcow2_path, (target_dev, outcome) in zip(qcow2_paths, attach_disk_group(dom, qcow2_paths)):
+        result: dict = {"qcow2_path": qcow2_path, "target_dev": target_dev}
+        if outcome is True:
+            result["status"] = "success"
+        elif outcome is False:
+            result.update(status="error", detail="Failed to attach disk")
+        else:
+            result.update(status="error", detail=str(outcome))
+        results.append(result)
+
+    succeeded: int = sum(1 for result in results if result["status"] == "success")
+    logger.info("Batch disk attachment finished - VM: '%s', Attached: %s/%s", vm_name, succeeded, len(results))
+    return results
@@ -1,22 +1,20 @@
 import libvirt # type: ignore
-import textwrap
-import xml.etree.ElementTree as ET
+from lxml import etree # type: ignore
 import time
 import logging
-# import textwrap
 from typing import Optional
 from src.utils.config import config
-from src.utils.libvirt_utils import parse_domain_xml
-from src.utils.exceptions import DiskNotFound
-from src.services.disk_utils import _create_disk_xml
+from src.utils.domain_xml_cache import parse_domain_xml
+from src.utils.libvirt_events import DeviceEventWaiter
+from src.utils.libvirt_cache import get_domain
+from src.utils.exceptions import DiskNotFound, VMNotRunning
+from src.services.disk_utils import _DISK_TARGET_EXISTS_XPATH, _create_disk_xml, _find_disk, ensure_vm_running
 
 logger: logging.Logger = logging.getLogger(__name__)
 
-# Define XML namespaces used in libvirt domain XML
-NAMESPACES = {'lib': 'http://libvirt.org/schemas/domain/qemu/1.0'}
-
 # TODO: do we need this?
-def get_disk_xml_for_target_dev(dom: libvirt.virDomain, target_dev: str) -> str:
+def get_disk_xml_for_target_dev(dom: libvirt.virDomain, target_dev: str,
+                                parsed_root: Optional[etree._Element] = None) -> str:
     """
     Extract XML description of specific disk from VM's domain XML.
     
@@ -26,6 +24,7 @@ def get_disk_xml_for_target_dev(dom: libvirt.virDomain, target_dev: str) -> str:
     Args:
         dom: libvirt Domain object for the target VM
         target_dev: Target device name to search for (e.g., 'vdb', 'vdc')
+        parsed_root: Already-parsed persistent domain XML (fetched if None)
         
     Returns:
         str: Complete XML string of the disk element
@@ -38,41 +37,41 @@ def get_disk_xml_for_target_dev(dom: libvirt.virDomain, target_dev: str) -> str:
         Only returns XML for file-backed disks (not block devices or other types).
     """
     vm_name = dom.name()
-    logger.info(f"Retrieving disk XML for device '{target_dev}' in VM '{vm_name}'")
+    logger.info("Retrieving disk XML for device '%s' in VM '%s'", target_dev, vm_name)
     
     try:
-        root = parse_domain_xml(dom, live=False)
+        root = parsed_root if parsed_root is not None else parse_domain_xml(dom, live=False)
+        
+        # Domain XML has no default namespace, so the disk is matched by plain tag
+        disk_elem = _find_disk(root, target_dev)
+        if disk_elem is None:
+            error_msg = f"Disk with target '{target_dev}' not found"
+            logger.error("Disk not found in VM '%s': %s", vm_name, error_msg)
+            raise ValueError(error_msg)
+        logger.debug("Found matching disk element for device '%s'", target_dev)
         
-        for disk_elem in root.findall(".//lib:disk", NAMESPACES):
-            target_elem = disk_elem.find("lib:target", NAMESPACES)
-            if target_elem is not None and target_elem.get("dev") == target_dev:
-                logger.debug(f"Found matching disk element for device '{target_dev}'")
-                
-                # Validate it's a file-backed disk
-                source_elem = disk_elem.find("source")
-                if source_elem is None or not source_elem.get("file"):
-                    error_msg = f"Disk '{target_dev}' is not a file-backed disk"
-                    logger.error(f"Invalid disk type for VM '{vm_name}': {error_msg}")
-                    raise ValueError(error_msg)
-                
-                disk_xml = ET.tostring(disk_elem, encoding='unicode')
-                source_file = source_elem.get("file")
-                logger.info(f"Successfully retrieved disk XML for VM '{vm_name}', device '{target_dev}', source: '{source_file}'")
-                logger.debug(f"Disk XML: {disk_xml}")
-                return disk_xml
+        # Validate it's a file-backed disk
+        source_elem = disk_elem.find("source")
+        if source_elem is None or not source_elem.get("file"):
+            error_msg = f"Disk '{target_dev}' is not a file-backed disk"
+            logger.error("Invalid disk type for VM '%s': %s", vm_name, error_msg)
+            raise ValueError(error_msg)
         
-        error_msg = f"Disk with target '{target_dev}' not found"
-        logger.error(f"Disk not found in VM '{vm_name}': {error_msg}")
-        raise ValueError(error_msg)
+        disk_xml = etree.tostring(disk_elem, encoding='unicode')
+        source_file = source_elem.get("file")
+        logger.info("Successfully retrieved disk XML for VM '%s', device '%s', source: '%s'", vm_name, target_dev, source_file)
+        logger.debug("Disk XML: %s", disk_xml)
+        return disk_xml
         
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse VM XML for '{vm_name}': {e}")
+    except etree.XMLSyntaxError as e:
+        logger.error("Failed to parse VM XML for '%s': %s", vm_name, e)
         raise ValueError(f"Failed to parse VM configuration: {e}")
     except Exception as e:
-        logger.error(f"Unexpected error retrieving disk XML for VM '{vm_name}', device '{target_dev}': {e}")
+        logger.error("Unexpected error retrieving disk XML for VM '%s', device '%s': %s", vm_name, target_dev, e)
         raise
 
-def _get_disk_source_path(dom: libvirt.virDomain, target_dev: str) -> str:
+def _get_disk_source_path(dom: libvirt.virDomain, target_dev: str,
+                          parsed_root: Optional[etree._Element] = None) -> str:
     """
     Get the source file path for a disk by its target device.
     
@@ -83,6 +82,7 @@ def _get_disk_source_path(dom: libvirt.virDomain, target_dev: str) -> str:
     Args:
         dom: libvirt Domain object for the target VM
         target_dev: Target device name to search for (e.g., 'vdb', 'vdc')
+        parsed_root: Already-parsed live domain XML (fetched if None)
         
     Returns:
         str: The source path of the disk file.
@@ -92,37 +92,53 @@ def _get_disk_source_path(dom: libvirt.virDomain, target_dev: str) -> str:
         ValueError: If the found disk is not a file-backed disk.
     """
     vm_name = dom.name()
-    logger.debug(f"Retrieving source path for device '{target_dev}' in VM '{vm_name}'")
-    
-    root = parse_domain_xml(dom, live=True)
-    for disk_element in root.findall(".//devices/disk"):
-        target_element = disk_element.find("target")
-        if target_element is not None and target_element.get("dev") == target_dev:
-            source_element = disk_element.find("source")
-            if source_element is not None and source_element.get("file"):
-                source_path = source_element.get("file")
-                if source_path:
-                    logger.debug(f"Found source path '{source_path}' for device '{target_dev}'")
-                    return source_path
-                else:
-                    logger.debug(f"Source path not found for device '{target_dev}'")
-                    raise ValueError(f"Source path not found for device '{target_dev}'")
-            else:
-                raise ValueError(f"Disk '{target_dev}' is not a file-backed disk")
+    logger.debug("Retrieving source path for device '%s' in VM '%s'", target_dev, vm_name)
+    
+    root = parsed_root if parsed_root is not None else parse_domain_xml(dom, live=True)
+    disk_element = _find_disk(root, target_dev)
+    if disk_element is not None:
+        source_element = disk_element.find("source")
+        source_path = source_element.get("file") if source_element is not None else None
+        if not source_path:
+            raise ValueError(f"Disk '{target_dev}' is not a file-backed disk")
+        logger.debug("Found source path '%s' for device '%s'", source_path, target_dev)
+        return source_path
     
     raise DiskNotFound(f"Disk with target '{target_dev}' not found in VM '{vm_name}'")
 
-def poll_for_disk_removal(dom: libvirt.virDomain, target_dev: str, timeout: Optional[int] = None) -> bool:
+def _is_disk_present(dom: libvirt.virDomain, target_dev: str) -> bool:
+    """
+    Check whether a disk with this target device is still attached to the running VM.
+
+    blockInfo on the target fails with VIR_ERR_INVALID_ARG once the disk is
+    gone, so no domain XML has to be fetched. Falls back to the live XML if
+    blockInfo fails for any other reason.
     """
-    Poll VM's live XML to confirm disk removal.
+    try:
+        dom.blockInfo(target_dev)
+        return True
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_INVALID_ARG:
+            return False
+        logger.debug("blockInfo failed for '%s', checking the live XML: %s", target_dev, e)
+    return _DISK_TARGET_EXISTS_XPATH(parse_domain_xml(dom, live=True), dev=target_dev)
+
+def poll_for_disk_removal(dom: libvirt.virDomain, target_dev: str, timeout: Optional[int] = None,
+                          waiter: Optional[DeviceEventWaiter] = None) -> bool:
+    """
+    Poll the VM's block devices to confirm disk removal.
     
-    Continuously checks the VM's live configuration to verify that the specified
-    disk device has been successfully removed from the domain.
+    Continuously checks the running VM to verify that the specified disk
+    device has been successfully removed from the domain.
     
     Args:
         dom: libvirt Domain object for the target VM
         target_dev: Target device name to check for removal (e.g., 'vdb')
         timeout: Maximum time to wait in seconds (uses config default if None)
+        waiter: Device-removed event waiter. If it is registered for the disk's
+            alias, its event alone confirms the removal and the XML is only
+            read once on timeout; otherwise it wakes the polling loop early
+            (plain sleep between polls if None)
         
     Returns:
         bool: True if disk successfully removed, False if timeout reached
@@ -131,53 +147,63 @@ def poll_for_disk_removal(dom: libvirt.virDomain, target_dev: str, timeout: Opti
         libvirt.libvirtError: If unable to retrieve VM configuration
         
     Note:
-        Polls at intervals defined by DISK_DETACH_POLL_INTERVAL configuration.
+        When no alias-specific event can be used, polls with exponential
+        backoff: from DISK_DETACH_POLL_INITIAL, growing by DISK_DETACH_POLL_BACKOFF
+        per attempt, up to DISK_DETACH_POLL_INTERVAL.
     """
     if timeout is None:
         timeout = config.DISK_DETACH_TIMEOUT
     
     vm_name = dom.name()
-    max_retries = int(timeout / config.DISK_DETACH_POLL_INTERVAL)
+    # Config values are read from the environment on every access
+    poll_interval: float = config.DISK_DETACH_POLL_INTERVAL
+    # Unset initial interval or backoff factor means fixed-interval polling
+    interval: float = min(config.DISK_DETACH_POLL_INITIAL or poll_interval, poll_interval)
+    backoff: float = max(config.DISK_DETACH_POLL_BACKOFF, 1.0)
+    wait = waiter.wait if waiter is not None else time.sleep
     
-    logger.info(f"Starting disk removal polling - VM: '{vm_name}', Device: '{target_dev}', Timeout: {timeout}s, Max retries: {max_retries}")
+    logger.info("Starting disk removal polling - VM: '%s', Device: '%s', Timeout: %ss", vm_name, target_dev, timeout)
     
     try:
-        for attempt in range(max_retries):
-            logger.debug(f"Polling attempt {attempt + 1}/{max_retries} for disk '{target_dev}' removal")
-            try:
-                # If _get_disk_source_path finds the device, it's still attached.
-                _get_disk_source_path(dom, target_dev)
-                logger.debug(f"Disk '{target_dev}' still present in VM '{vm_name}' configuration")
-            except DiskNotFound:
-                # If the disk is not found, it has been successfully detached.
-                logger.info(f"Successfully confirmed disk '{target_dev}' removed from VM '{vm_name}' (attempt {attempt + 1})")
+        if waiter is not None and waiter.alias is not None and waiter.registered:
+            # QEMU acknowledged the unplug of exactly this device
+            if waiter.wait(timeout):
+                logger.info("Successfully confirmed disk '%s' removed from VM '%s' (device removed event)", target_dev, vm_name)
+                return True
+            # No event: check the disk itself
+            if not _is_disk_present(dom, target_dev):
+                logger.info("Successfully confirmed disk '%s' removed from VM '%s'", target_dev, vm_name)
+                return True
+            logger.error("Timeout waiting for disk '%s' removal from VM '%s' after %ss", target_dev, vm_name, timeout)
+            return False
+
+        start: float = time.monotonic()
+        deadline: float = start + timeout
+        while True:
+            if not _is_disk_present(dom, target_dev):
+                logger.info("Successfully confirmed disk '%s' removed from VM '%s' after %.3fs", target_dev, vm_name, time.monotonic() - start)
                 return True
 
-            if attempt < max_retries - 1:  # Don't sleep on the last attempt
-                logger.debug(f"Disk '{target_dev}' still present, waiting {config.DISK_DETACH_POLL_INTERVAL}s before retry")
-                time.sleep(config.DISK_DETACH_POLL_INTERVAL)
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait(min(interval, remaining))
+            interval = min(interval * backoff, poll_interval)
         
-        logger.error(f"Timeout waiting for disk '{target_dev}' removal from VM '{vm_name}' after {timeout}s ({max_retries} attempts)")
+        logger.error("Timeout waiting for disk '%s' removal from VM '%s' after %.3fs", target_dev, vm_name, time.monotonic() - start)
         return False
         
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse VM XML during polling for VM '{vm_name}': {e}")
+    except etree.XMLSyntaxError as e:
+        logger.error("Failed to parse VM XML during polling for VM '%s': %s", vm_name, e)
         return False
     except Exception as e:
-        logger.error(f"Unexpected error during disk removal polling for VM '{vm_name}', device '{target_dev}': {e}")
+        logger.error("Unexpected error during disk removal polling for VM '%s', device '%s': %s", vm_name, target_dev, e)
         return False
     
    
 def _validate_vm_for_detach(dom: libvirt.virDomain) -> None:
     """Validate VM is running and ready for hot-detach."""
-    vm_name = dom.name()
-    vm_state = dom.state()
-    logger.info(f"Found VM '{vm_name}' (ID: {dom.ID()}, State: {vm_state})")
-    
-    if vm_state[0] != libvirt.VIR_DOMAIN_RUNNING:
-        error_msg = f"VM '{vm_name}' is not running (state: {vm_state[0]})"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
+    ensure_vm_running(dom)
 
 
 def detach_disk(conn: libvirt.virConnect, vm_name: str, target_dev: str) -> bool:
@@ -192,31 +218,82 @@ def detach_disk(conn: libvirt.virConnect, vm_name: str, target_dev: str) -> bool
         bool: True if detachment was successful
         
     Raises:
+        VMNotRunning: If the VM is not running
         RuntimeError: If disk detachment fails
     """
-    logger.info(f"Starting disk detachment - VM: '{vm_name}', Device: '{target_dev}'")
+    logger.info("Starting disk detachment - VM: '%s', Device: '%s'", vm_name, target_dev)
     
     try:
         # Let libvirtError (e.g., VM not found) propagate to the global handler.
-        # Let ValueError/DiskNotFound propagate to the API route handler.
-        dom: libvirt.virDomain = conn.lookupByName(vm_name)
+        # Let VMNotRunning/DiskNotFound propagate to the API route handler.
+        dom: libvirt.virDomain = get_domain(conn, vm_name)
         _validate_vm_for_detach(dom)
-        logger.debug(f"Retrieving source path for device '{target_dev}'")
-        source_path: str = _get_disk_source_path(dom, target_dev)
+        logger.debug("Retrieving source path for device '%s'", target_dev)
+        # Single live read for the pre-detach lookups
+        root = parse_domain_xml(dom, live=True)
+        source_path: str = _get_disk_source_path(dom, target_dev, parsed_root=root)
         disk_xml = _create_disk_xml(source_path, target_dev)    
-        logger.debug(f"Using the following disk XML:\n{disk_xml}")
-        flags = libvirt.VIR_DOMAIN_AFFECT_LIVE | libvirt.VIR_DOMAIN_AFFECT_CONFIG
-        dom.detachDeviceFlags(disk_xml, flags)
-        logger.info(f"Detachment with flags executed successfully")
+        # Removal events name the device by its QEMU alias
+        alias_elem = _find_disk(root, target_dev).find("alias")
+        alias: Optional[str] = alias_elem.get("name") if alias_elem is not None else None
+        logger.debug("Using the following disk XML:\n%s", disk_xml)
     except libvirt.libvirtError as e:
-        logger.error(f"Detachment failed: {e}")
+        logger.error("Detachment failed: %s", e)
         raise RuntimeError(f"Failed to detach disk '{target_dev}' from VM '{vm_name}': {e}")
 
-    # Verify the disk was actually detached
-    if not poll_for_disk_removal(dom, target_dev, timeout=10):
-        error_msg = f"Disk '{target_dev}' still attached to VM '{vm_name}' after detachment commands"
-        logger.error(error_msg)
-        raise RuntimeError(error_msg)
+    # Register for the removal event before detaching so it cannot be missed
+    with DeviceEventWaiter(dom, libvirt.VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED, alias=alias) as waiter:
+        try:
+            flags = libvirt.VIR_DOMAIN_AFFECT_LIVE | libvirt.VIR_DOMAIN_AFFECT_CONFIG
+            dom.detachDeviceFlags(disk_xml, flags)
+            logger.info("Detachment with flags executed successfully")
+        except libvirt.libvirtError as e:
+            logger.error("Detachment failed: %s", e)
+            raise RuntimeError(f"Failed to detach disk '{target_dev}' from VM '{vm_name}': {e}")
+
+        # Verify the disk was actually detached
+        if not poll_for_disk_removal(dom, target_dev, timeout=10, waiter=waiter):
+            error_msg = f"Disk '{target_dev}' still attached to VM '{vm_name}' after detachment commands"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
     
-    logger.info(f"Successfully verified disk '{target_dev}' was detached from VM '{vm_name}'")
-    return True
\ No newline at end of file
+    logger.info("Successfully verified disk '%s' was detached from VM '%s'", target_dev, vm_name)
+    return True
+
+def detach_disks(conn: libvirt.virConnect, vm_name: str, target_devs: list[str]) -> list[dict]:
+    """
+    Detach several disks from a running VM.
+
+    The domain is looked up once and each disk is detached in order. A
+    failure of one disk does not stop the others.
+
+    Args:
+        conn: libvirt connection
+        vm_name: Name of the VM
+        target_devs: Target device names to detach
+
+    Returns:
+        list[dict]: Per-disk result with target_dev, status and, on failure, detail
+
+    Raises:
+        libvirt.libvirtError: If the VM is not found
+        VMNotRunning: If the VM is not running
+    """
+    logger.info("Starting batch disk detachment - VM: '%s', Devices: %s", vm_name, target_devs)
+    # Resolve the VM up front so a missing or stopped VM fails the whole
+    # request; detach_disk then reuses the cached lookup and state.
+    _validate_vm_for_detach(get_domain(conn, vm_name))
+
+    results: list[dict] = []
+    for target_dev in target_devs:
+        result: dict = {"target_dev": target_dev}
+        try:
+            detach_disk(conn, vm_name, target_dev)
+            result["status"] = "success"
+        except (DiskNotFound, VMNotRunning, ValueError, RuntimeError) as e:
+            result.update(status="error", detail=str(e))
+        results.append(result)
+
+    succeeded: int = sum(1 for result in results if result["status"] == "success")
+    logger.info("Batch disk detachment finished - VM: '%s', Detached: %s/%s", vm_name, succeeded, len(results))
+    return results
@@ -1,7 +1,11 @@
-import xml.etree.ElementTree as ET
+from lxml import etree # type: ignore
+from xml.sax.saxutils import escape, quoteattr
 import logging
 from typing import List, Dict, Any, Optional
-from src.utils.libvirt_utils import parse_domain_xml, LIBVIRT_DOMAIN_NAMESPACE
+from src.utils.domain_xml_cache import parse_domain_xml
+from src.utils.libvirt_cache import get_domain_state
+from src.utils.exceptions import VMNotRunning
+from src.utils.config import config
 import libvirt # type: ignore
 
 
@@ -12,6 +16,13 @@ KVMFUN_METADATA_NAMESPACE = "http://kvmfun.com/schemas/disk/1.0"
 # TODO: move to config.py?
 KVMFUN_METADATA_PREFIX = "kvmfun"
 
+# Target device names of every disk in a domain XML
+_DISK_DEV_XPATH = etree.XPath("./devices/disk/target/@dev", smart_strings=False)
+# Whether a disk with target dev $dev is present, evaluated inside libxml2
+_DISK_TARGET_EXISTS_XPATH = etree.XPath("boolean(./devices/disk/target[@dev=$dev])")
+# File-backed disks that have both a target and a source
+_FILE_DISKS_XPATH = etree.XPath("./devices/disk[@type='file'][target][source]")
+
 
 def _create_disk_xml(qcow2_path: str, target_dev: str, metadata: Optional[Dict[str, str]] = None) -> str:
     """
@@ -25,73 +36,110 @@ def _create_disk_xml(qcow2_path: str, target_dev: str, metadata: Optional[Dict[s
 
     Returns:
         str: Disk XML as a string.
-
-    Raises:
-        ValueError: If disk conflicts are detected or creation fails.
     """
-    logger.debug(f"Creating disk XML for '{qcow2_path}' as '{target_dev}'")
+    logger.debug("Creating disk XML for '%s' as '%s'", qcow2_path, target_dev)
 
     # TODO: add parameters for all attributes
-    
-    try:
-        ET.register_namespace('', LIBVIRT_DOMAIN_NAMESPACE)
-        ET.register_namespace(KVMFUN_METADATA_PREFIX, KVMFUN_METADATA_NAMESPACE)
-        disk_element: ET.Element = ET.Element('disk', type='file', device='disk')
-        ET.SubElement(disk_element, 'driver', name='qemu', type='qcow2', cache='none')
-        ET.SubElement(disk_element, 'source', file=qcow2_path, index='2')
-        ET.SubElement(disk_element, 'target', dev=target_dev, bus='scsi')
-        ET.SubElement(disk_element, 'alias', name='virtio-disk1')
-        ET.SubElement(disk_element, 'address', type='drive', controller='0', bus='0', target='0', unit='1')
-        ET.SubElement(disk_element, 'removable', state='on')
-        if metadata:
-            metadata_element: ET.Element = ET.SubElement(disk_element, 'metadata')
-            for key, value in metadata.items():
-                meta_tag: str = f'{{{KVMFUN_METADATA_NAMESPACE}}}{key}'
-                meta_item: ET.Element = ET.SubElement(metadata_element, meta_tag)
-                meta_item.text = value
-        # Indent the XML tree to make it readable in logs
-        ET.indent(disk_element, space="  ")
-        disk_xml: str = ET.tostring(disk_element, encoding='unicode')
-        logger.debug(f"Generated disk XML:\n{disk_xml}")
-        return disk_xml
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse disk XML: {e}")
-        raise ValueError(f"Failed to parse disk XML: {e}")
-    except Exception as e:
-        logger.error(f"Unexpected error creating disk XML: {e}")
-        raise ValueError(f"Unexpected error creating disk XML: {e}")
-
-
-def _check_disk_conflicts(dom: libvirt.virDomain, qcow2_path: str, target_dev: str) -> bool:
-    """Check if disk is already attached or conflicts exist."""
-    vm_name = dom.name()
-    logger.debug(f"Checking disk conflicts for VM '{vm_name}', device '{target_dev}'")
-    root = parse_domain_xml(dom, live=True)
-    
-    for disk in root.findall(".//devices/disk"):
+
+    # Fixed-shape fragment: only the path, target and metadata values vary,
+    # and those are quoted/escaped below.
+    driver_attrs: str = ""
+    if config.DISK_DRIVER_IO:
+        driver_attrs += f" io={quoteattr(config.DISK_DRIVER_IO)}"
+    if config.DISK_DRIVER_DISCARD:
+        driver_attrs += f" discard={quoteattr(config.DISK_DRIVER_DISCARD)}"
+
+    namespace_attr: str = ""
+    metadata_xml: str = ""
+    if metadata:
+        namespace_attr = f" xmlns:{KVMFUN_METADATA_PREFIX}={quoteattr(KVMFUN_METADATA_NAMESPACE)}"
+        metadata_items: str = "".join(
+            f"<{KVMFUN_METADATA_PREFIX}:{key}>{escape(value)}</{KVMFUN_METADATA_PREFIX}:{key}>"
+            for key, value in metadata.items()
+        )
+        metadata_xml = f"<metadata>{metadata_items}</metadata>"
+
+    disk_xml: str = (
+        f'<disk{namespace_attr} type="file" device="disk">'
+        f'<driver name="qemu" type="qcow2" cache="none"{driver_attrs}/>'
+        f'<source file={quoteattr(qcow2_path)} index="2"/>'
+        f'<target dev={quoteattr(target_dev)} bus="scsi"/>'
+        '<alias name="virtio-disk1"/>'
+        '<address type="drive" controller="0" bus="0" target="0" unit="1"/>'
+        '<removable state="on"/>'
+        f'{metadata_xml}'
+        '</disk>'
+    )
+    logger.debug("Generated disk XML:\n%s", disk_xml)
+    return disk_xml
+
+
+def _find_disk(root: etree._Element, target_dev: str, qcow2_path: Optional[str] = None) -> Optional[etree._Element]:
+    """
+    Find a disk element in an already-parsed domain XML.
+
+    Args:
+        root: Parsed XML root element
+        target_dev: Target device name to search for
+        qcow2_path: Also match a disk whose source file is this path
+
+    Returns:
+        Optional[etree._Element]: First matching disk element, or None if not found
+    """
+    for disk in root.findall("./devices/disk"):
         target = disk.find("target")
-        source = disk.find("source")
-        
         if target is not None and target.get('dev') == target_dev:
-            existing_source = source.get('file') if source is not None else 'unknown'
-            if existing_source == qcow2_path:
-                logger.warning(f"Disk '{qcow2_path}' already attached as '{target_dev}' to VM '{vm_name}'")
-                return True
-            error_msg = f"Target device '{target_dev}' already in use by '{existing_source}'"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-        
-        if source is not None and source.get('file') == qcow2_path:
-            existing_target = target.get('dev') if target is not None else 'unknown'
-            error_msg = f"Disk '{qcow2_path}' already attached as '{existing_target}'"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
+            return disk
+        if qcow2_path is not None:
+            source = disk.find("source")
+            if source is not None and source.get('file') == qcow2_path:
+                return disk
+    return None
+
+def _check_disk_conflicts(dom: libvirt.virDomain, qcow2_path: str, target_dev: str,
+                          root: Optional[etree._Element] = None) -> bool:
+    """Check if disk is already attached or conflicts exist."""
+    vm_name = dom.name()
+    logger.debug("Checking disk conflicts for VM '%s', device '%s'", vm_name, target_dev)
+    if root is None:
+        root = parse_domain_xml(dom, live=True)
     
-    logger.debug(f"No disk conflicts found for VM '{vm_name}'")
-    return False
+    disk = _find_disk(root, target_dev, qcow2_path)
+    if disk is None:
+        logger.debug("No disk conflicts found for VM '%s'", vm_name)
+        return False
+
+    target = disk.find("target")
+    source = disk.find("source")
+    existing_target = target.get('dev') if target is not None else 'unknown'
+    existing_source = source.get('file') if source is not None else 'unknown'
+
+    if existing_target == target_dev and existing_source == qcow2_path:
+        logger.warning("Disk '%s' already attached as '%s' to VM '%s'", qcow2_path, target_dev, vm_name)
+        return True
+    if existing_target == target_dev:
+        error_msg = f"Target device '{target_dev}' already in use by '{existing_source}'"
+    else:
+        error_msg = f"Disk '{qcow2_path}' already attached as '{existing_target}'"
+    logger.error(error_msg)
+    raise ValueError(error_msg)
+
+def ensure_vm_running(dom: libvirt.virDomain) -> None:
+    """
+    Check that a VM is running, as required for hot-plugging disks.
+
+    Args:
+        dom: libvirt Domain object
+
+    Raises:
+        VMNotRunning: If the VM is not in the running state
+    """
+    state: int = get_domain_state(dom)
+    if state != libvirt.VIR_DOMAIN_RUNNING:
+        raise VMNotRunning(f"VM '{dom.name()}' is not running (state: {state})")
 
 # TODO: do we need this?
-def find_disk_by_target(root: ET.Element, target_dev: str) -> ET.Element:
+def find_disk_by_target(root: etree._Element, target_dev: str) -> etree._Element:
     """
     Find disk element by target device name.
     
@@ -100,17 +148,15 @@ def find_disk_by_target(root: ET.Element, target_dev: str) -> ET.Element:
         target_dev: Target device name to search for
         
     Returns:
-        ET.Element: Disk element if found
+        etree._Element: Disk element if found
         
     Raises:
         ValueError: If disk not found
     """
-    for disk in root.findall(".//devices/disk"):
-        target = disk.find("target")
-        if target is not None and target.get('dev') == target_dev:
-            return disk
-    
-    raise ValueError(f"Disk with target '{target_dev}' not found")
+    disk = _find_disk(root, target_dev)
+    if disk is None:
+        raise ValueError(f"Disk with target '{target_dev}' not found")
+    return disk
 
 # TODO: do we need this?
 def get_used_device_names(dom: libvirt.virDomain) -> set:
@@ -124,20 +170,12 @@ def get_used_device_names(dom: libvirt.virDomain) -> set:
         set: Set of used device names
     """
     vm_name = dom.name()
-    logger.debug(f"Getting used device names for VM '{vm_name}'")
+    logger.debug("Getting used device names for VM '%s'", vm_name)
     
     root = parse_domain_xml(dom, live=True)
-    used_devices = set()
-    
-    for disk in root.findall(".//devices/disk"):
-        target = disk.find("target")
-        if target is not None:
-            dev = target.get('dev')
-            if dev:
-                used_devices.add(dev)
-                logger.debug(f"Found used device: {dev}")
+    used_devices = {dev for dev in _DISK_DEV_XPATH(root) if dev}
     
-    logger.info(f"Used device names in VM '{vm_name}': {sorted(used_devices)}")
+    logger.info("Used device names in VM '%s': %s", vm_name, sorted(used_devices))
     return used_devices
 
 def list_vm_disks(dom: libvirt.virDomain) -> List[Dict[str, Any]]:
@@ -151,22 +189,20 @@ def list_vm_disks(dom: libvirt.virDomain) -> List[Dict[str, Any]]:
         List[Dict]: List of disk information dictionaries
     """
     vm_name = dom.name()
-    logger.debug(f"Listing disks for VM '{vm_name}'")
+    logger.debug("Listing disks for VM '%s'", vm_name)
     
     root = parse_domain_xml(dom, live=True)
     disks = []
     
-    for disk in root.findall(".//devices/disk[@type='file']"):
+    for disk in _FILE_DISKS_XPATH(root):
         target = disk.find("target")
-        source = disk.find("source")
-        if target is not None and source is not None:
-            disk_info = {
-                "target_dev": target.get("dev"),
-                "source_file": source.get("file"),
-                "bus": target.get("bus")
-            }
-            disks.append(disk_info)
-            logger.debug(f"Found disk: {disk_info}")
+        disk_info = {
+            "target_dev": target.get("dev"),
+            "source_file": disk.find("source").get("file"),
+            "bus": target.get("bus")
+        }
+        disks.append(disk_info)
+        logger.debug("Found disk: %s", disk_info)
     
-    logger.info(f"Listed {len(disks)} disks for VM '{vm_name}'")
+    logger.info("Listed %s disks for VM '%s'", len(disks), vm_name)
     return disks
\ No newline at end of file
@@ -1,9 +1,11 @@
 import os
 import logging
-import xml.etree.ElementTree as ET
+from lxml import etree # type: ignore
 from xml.sax.saxutils import escape
 import libvirt # type: ignore
 import textwrap
+from src.utils.domain_xml_cache import parse_domain_xml
+from src.utils.libvirt_cache import get_domain, invalidate_domain
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -27,7 +29,7 @@ def list_vms(conn: libvirt.virConnect) -> list:
             }
             vms.append(vm_info)
         except libvirt.libvirtError as e:
-            logger.error(f"Error retrieving VM information: {e}")
+            logger.error("Error retrieving VM information: %s", e)
     return vms
 
 def create_vm(
@@ -81,12 +83,14 @@ def create_vm(
         </domain>
     """)
 
-    logger.debug(f"Creating VM with XML:\n{domain_xml}")
+    logger.debug("Creating VM with XML:\n%s", domain_xml)
 
     # Define the VM
     domain: libvirt.virDomain = conn.defineXML(domain_xml)
     if domain is None:
         raise Exception("Failed to define the VM domain")
+    # Drop any lookup of a previous VM with this name before the event arrives
+    invalidate_domain(vm_name, forget_uuid=True)
     return domain.UUIDString()
   
 def delete_vm(vm_name: str, conn: libvirt.virConnect) -> bool:
@@ -104,14 +108,15 @@ def delete_vm(vm_name: str, conn: libvirt.virConnect) -> bool:
         Exception: If there is an error during deletion.
     """
     try:
-        domain: libvirt.virDomain = conn.lookupByName(vm_name)
+        domain: libvirt.virDomain = get_domain(conn, vm_name)
         # check if vm is running
         if domain.isActive():
             domain.destroy()  # Stop the VM if it's running
         domain.undefine()  # Remove the VM definition
+        invalidate_domain(vm_name, forget_uuid=True)
         return True
     except libvirt.libvirtError as e:
-        if 'does not exist' in str(e):
+        if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
             return False  # VM not found
         raise e  # Re-raise other errors  
 
@@ -127,7 +132,7 @@ def start_vm(vm_name: str, conn: libvirt.virConnect) -> bool:
         Exception: If the VM cannot be found or started.
     """
     try:
-        domain: libvirt.virDomain = conn.lookupByName(vm_name)
+        domain: libvirt.virDomain = get_domain(conn, vm_name)
         domain.create()
         return True
     except libvirt.libvirtError as e:
@@ -145,7 +150,7 @@ def stop_vm(vm_name: str, conn: libvirt.virConnect) -> bool:
     Raises:
         Exception: If the VM cannot be found or stopped.
     """
-    domain: libvirt.virDomain = conn.lookupByName(vm_name)
+    domain: libvirt.virDomain = get_domain(conn, vm_name)
     if domain is None:
         raise Exception("Failed to find VM with name: " + vm_name)
     try:
@@ -167,18 +172,16 @@ def get_vm_info(vm_name: str, conn: libvirt.virConnect) -> dict:
         Exception: If the VM cannot be found.
     """
     try:
-        domain: libvirt.virDomain = conn.lookupByName(vm_name)
+        domain: libvirt.virDomain = get_domain(conn, vm_name)
         info: tuple = domain.info()
-        xml_desc: str = domain.XMLDesc(0)
-        logger.debug(f"VM XML description:\n{xml_desc}")
-        root: ET.Element = ET.fromstring(xml_desc)
+        root: etree._Element = parse_domain_xml(domain, live=False)
 
         # get info of all disks
         disks: dict = {}
-        disks_elements: list[ET.Element] = root.findall("./devices/disk[@type='file']")
+        disks_elements: list[etree._Element] = root.findall("./devices/disk[@type='file']")
         for disk_element in disks_elements:
-            source_elem: ET.Element | None = disk_element.find("source")
-            target_elem: ET.Element | None = disk_element.find("target")          
+            source_elem: etree._Element | None = disk_element.find("source")
+            target_elem: etree._Element | None = disk_element.find("target")          
             if source_elem is not None and target_elem is not None:
                 source_path: str | None = source_elem.get('file')
                 if source_path:
@@ -187,9 +190,9 @@ def get_vm_info(vm_name: str, conn: libvirt.virConnect) -> dict:
                         "source": source_path,
                         "target": target_elem.get('dev')
                     }
-                    logger.debug(f"Disk: {disk_name}, Source: {source_path}, Target: {target_elem.get('dev')}")
+                    logger.debug("Disk: %s, Source: %s, Target: %s", disk_name, source_path, target_elem.get('dev'))
 
-        network_source: ET.Element | None = root.find("./devices/interface/source")
+        network_source: etree._Element | None = root.find("./devices/interface/source")
 
         return {
             "name": domain.name(),
@@ -1,6 +1,9 @@
 import libvirt #type: ignore
 import logging
 import textwrap
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+from src.utils.libvirt_cache import get_storage_pool
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -9,31 +12,38 @@ def create_volume(
     vol_name: str, 
     size_gb: int,
     pool_name: str = 'default', 
+    backing_vol_name: Optional[str] = None,
+    backing_format: str = 'qcow2',
     ) -> str:
     """
     Create a new QCOW2 storage volume on a remote host using libvirt.
 
     This function commands the remote libvirt daemon to create a new, empty
-    disk image (storage volume) within a specified storage pool.
+    disk image (storage volume) within a specified storage pool. When a
+    backing volume is given, the new volume is a copy-on-write overlay on top
+    of it, so no image data is copied.
 
     Args:
         conn: Active libvirt connection to the remote host.
         vol_name: The desired name for the new volume (e.g., 'my-vm-disk.qcow2').
         size_gb: The size of the new volume in gigabytes.
         pool_name: The name of the storage pool where the volume will be created (e.g., 'default').
+        backing_vol_name: Optional volume in the same pool to use as the base image.
+        backing_format: Image format of the backing volume (e.g., 'qcow2').
 
     Returns:
         The full path of the created volume on the libvirt host.
 
     Raises:
-        ValueError: If the storage pool is not found, is inactive, or creation fails.
+        ValueError: If the storage pool or backing volume is not found, the pool
+            is inactive, or creation fails.
         libvirt.libvirtError: For other libvirt API errors during creation.
     """
-    logger.info(f"Creating volume '{vol_name}' in pool '{pool_name}' with size {size_gb}GB.")
+    logger.info("Creating volume '%s' in pool '%s' with size %sGB.", vol_name, pool_name, size_gb)
     try:
-        pool: libvirt.virStoragePool = conn.storagePoolLookupByName(pool_name)
+        pool: libvirt.virStoragePool = get_storage_pool(conn, pool_name)
     except libvirt.libvirtError as e:
-        logger.error(f"Storage pool '{pool_name}' not found: {e}")
+        logger.error("Storage pool '%s' not found: %s", pool_name, e)
         raise ValueError(f"Storage pool '{pool_name}' not found.")
 
     if not pool.isActive():
@@ -42,6 +52,19 @@ def create_volume(
     # Convert GB to bytes for the XML capacity element
     capacity = size_gb * 1024 * 1024 * 1024
 
+    backing_store_xml = ""
+    if backing_vol_name:
+        try:
+            backing_path: str = pool.storageVolLookupByName(backing_vol_name).path()
+        except libvirt.libvirtError as e:
+            logger.error("Backing volume '%s' not found in pool '%s': %s", backing_vol_name, pool_name, e)
+            raise ValueError(f"Backing volume '{backing_vol_name}' not found in pool '{pool_name}'.")
+        logger.debug("Using backing volume '%s' (%s)", backing_path, backing_format)
+        backing_store_xml = (
+            f"<backingStore><path>{escape(backing_path)}</path>"
+            f"<format type={quoteattr(backing_format)}/></backingStore>"
+        )
+
     # Define the correct <volume> XML for creating a new storage volume
     vol_xml = textwrap.dedent(f"""
         <volume>
@@ -50,6 +73,7 @@ def create_volume(
             <target>
                 <format type='qcow2'/>
             </target>
+            {backing_store_xml}
         </volume>
     """)
 
@@ -57,8 +81,8 @@ def create_volume(
         # Use libvirt's storageVolCreateXML to create the disk remotely
         vol: libvirt.virStorageVol = pool.createXML(vol_xml, 0)
         path: str = vol.path()
-        logger.info(f"Successfully created volume '{vol.name()}' at path: {path}")
+        logger.info("Successfully created volume '%s' at path: %s", vol.name(), path)
         return path
     except libvirt.libvirtError as e:
-        logger.error(f"Failed to create volume '{vol_name}' in pool '{pool_name}': {e}")
+        logger.error("Failed to create volume '%s' in pool '%s': %s", vol_name, pool_name, e)
         raise ValueError(f"Failed to create disk image remotely: {e}")
\ No newline at end of file
@@ -1,11 +1,70 @@
 import libvirt # type: ignore
+import io
 import logging
-import xml.etree.ElementTree as ET
-from src.utils.libvirt_utils import parse_domain_xml
+from lxml import etree # type: ignore
 from src.utils.exceptions import VolumeInUseError
+from src.utils.libvirt_cache import get_storage_pool
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+def _domain_uses_file(dom: libvirt.virDomain, path: str) -> bool:
+    """
+    Check whether the persistent configuration of a domain has a file disk with this source.
+
+    The XML is stream-parsed: only <disk> elements are materialized and each
+    one is freed once checked, and parsing stops at the first match. Each
+    domain is read once here, so parse_domain_xml is not used.
+
+    Raises:
+        libvirt.libvirtError: If the domain XML cannot be retrieved
+    """
+    # Persistent configuration, as the VM might be shut down but still have the disk in its definition
+    xml_desc: str = dom.XMLDesc(0)
+    for _, disk in etree.iterparse(io.BytesIO(xml_desc.encode()), events=('end',), tag='disk',
+                                   no_network=True, resolve_entities=False, collect_ids=False):
+        if disk.get("type") == "file":
+            source: etree._Element | None = disk.find("source")
+            if source is not None and source.get("file") == path:
+                return True
+        disk.clear()
+        while disk.getprevious() is not None:
+            del disk.getparent()[0]
+    return False
+
+def _find_vm_using_file(conn: libvirt.virConnect, path: str) -> str | None:
+    """
+    Find a VM whose disks use this file.
+
+    Block and state stats of all domains are fetched in one call. Their disk
+    paths reflect the persistent configuration of shut-off domains and the
+    live configuration of the others, so only running domains still need
+    their persistent XML checked (a disk may be in the definition only).
+    If the bulk stats are unavailable, every domain's XML is checked.
+
+    Returns:
+        str | None: Name of a VM using the file, or None
+    """
+    try:
+        records: list = conn.getAllDomainStats(libvirt.VIR_DOMAIN_STATS_STATE | libvirt.VIR_DOMAIN_STATS_BLOCK)
+    except libvirt.libvirtError as e:
+        logger.warning("Bulk domain stats unavailable, checking every domain's XML: %s", e)
+        to_scan: list[libvirt.virDomain] = conn.listAllDomains(0)
+    else:
+        to_scan = []
+        for dom, stats in records:
+            if any(stats.get(f"block.{i}.path") == path for i in range(stats.get("block.count", 0))):
+                return dom.name()
+            if stats.get("state.state") != libvirt.VIR_DOMAIN_SHUTOFF:
+                to_scan.append(dom)
+
+    for dom in to_scan:
+        try:
+            if _domain_uses_file(dom, path):
+                return dom.name()
+        except libvirt.libvirtError:
+            logger.warning("Could not check domain '%s' for volume usage. Skipping.", dom.name())
+    return None
+
 def delete_volume(conn: libvirt.virConnect, pool_name: str, volume_name: str):
     """
     Deletes a storage volume after ensuring it is not in use by any VM.
@@ -19,39 +78,28 @@ def delete_volume(conn: libvirt.virConnect, pool_name: str, volume_name: str):
         VolumeInUseError: If the volume is attached to any VM.
         libvirt.libvirtError: For other libvirt-related errors.
     """
-    logger.info(f"Attempting to delete volume '{volume_name}' from pool '{pool_name}'.")
+    logger.info("Attempting to delete volume '%s' from pool '%s'.", volume_name, pool_name)
 
     try:
-        pool: libvirt.virStoragePool = conn.storagePoolLookupByName(pool_name)
+        pool: libvirt.virStoragePool = get_storage_pool(conn, pool_name)
         vol: libvirt.virStorageVol = pool.storageVolLookupByName(volume_name)
         vol_path: str = vol.path()
     except libvirt.libvirtError as e:
         # If pool or volume doesn't exist, it's safe to consider it "deleted".
         # This maintains idempotency for the delete operation.
         if e.get_error_code() in (libvirt.VIR_ERR_NO_STORAGE_POOL, libvirt.VIR_ERR_NO_STORAGE_VOL):
-            logger.warning(f"Volume '{volume_name}' or pool '{pool_name}' not found. Assuming already deleted.")
+            logger.warning("Volume '%s' or pool '%s' not found. Assuming already deleted.", volume_name, pool_name)
             return
-        logger.error(f"Libvirt error looking up volume '{volume_name}': {e}")
+        logger.error("Libvirt error looking up volume '%s': %s", volume_name, e)
         raise # Re-raise other libvirt errors
 
     # Check if the volume is in use by any VM
-    all_domains: list[libvirt.virDomain] = conn.listAllDomains(0)
-    for dom in all_domains:
-        try:
-            # Check the persistent configuration, as the VM might be shut down
-            # but still have the disk attached in its definition.
-            root: ET.Element = parse_domain_xml(dom, live=False)
-            for disk in root.findall(".//disk[@type='file']"):
-                source: ET.Element | None = disk.find("source")
-                if source is not None and source.get("file") == vol_path:
-                    vm_name: str = dom.name()
-                    error_msg: str = f"Volume '{volume_name}' in pool '{pool_name}' is in use by VM '{vm_name}' and cannot be deleted. Please detach it first."
-                    logger.error(error_msg)
-                    raise VolumeInUseError(error_msg)
-        except libvirt.libvirtError:
-            logger.warning(f"Could+ not check domain '{dom.name()}' for volume usage. Skipping.")
-            continue
+    vm_name: str | None = _find_vm_using_file(conn, vol_path)
+    if vm_name is not None:
+        error_msg: str = f"Volume '{volume_name}' in pool '{pool_name}' is in use by VM '{vm_name}' and cannot be deleted. Please detach it first."
+        logger.error(error_msg)
+        raise VolumeInUseError(error_msg)
 
-    logger.info(f"Volume '{volume_name}' is not in use. Proceeding with deletion from path '{vol_path}'.")
+    logger.info("Volume '%s' is not in use. Proceeding with deletion from path '%s'.", volume_name, vol_path)
     vol.delete(flags=0)
-    logger.info(f"Successfully deleted volume '{volume_name}' from pool '{pool_name}'.")
\ No newline at end of file
+    logger.info("Successfully deleted volume '%s' from pool '%s'.", volume_name, pool_name)
\ No newline at end of file
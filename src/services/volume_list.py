@@ -1,6 +1,7 @@
 from typing import List, Dict, Any
 import libvirt # type: ignore
 import logging
+from src.utils.libvirt_cache import get_storage_pool
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -10,7 +11,7 @@ def list_volumes(conn: libvirt.virConnect, pool_name: str) -> List[Dict[str, Any
     """
     volumes: List[Dict[str, Any]] = []
     try:
-        pool: libvirt.virStoragePool = conn.storagePoolLookupByName(pool_name)
+        pool: libvirt.virStoragePool = get_storage_pool(conn, pool_name)
         pool.refresh()
         for vol_name in pool.listVolumes(): # Renamed 'vol' to 'vol_name' for clarity
             # Correctly get the volume object from the pool
@@ -18,7 +19,7 @@ def list_volumes(conn: libvirt.virConnect, pool_name: str) -> List[Dict[str, Any
             if vol_obj: # Ensure the volume object was found
                 volumes.append({"name": vol_name, "path": vol_obj.path()})
             else:
-                logger.warning(f"Volume '{vol_name}' not found in pool '{pool_name}' after listing.")
+                logger.warning("Volume '%s' not found in pool '%s' after listing.", vol_name, pool_name)
     except libvirt.libvirtError as e:
-        logger.error(f"Error listing volumes: {e}")
+        logger.error("Error listing volumes: %s", e)
     return volumes
\ No newline at end of file
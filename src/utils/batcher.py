@@ -0,0 +1,115 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+class _Batch:
+    """Items collected for one key, with the futures of their submitters."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.items: list[Any] = []
+        self.futures: list[asyncio.Future] = []
+
+def _fresh_exception(e: BaseException) -> BaseException:
+    """Copy of e for one submitter, so raising it does not rewrite the traceback or context seen by others."""
+    try:
+        clone: BaseException = copy.copy(e)
+    except Exception:
+        return e
+    # Traceback objects are immutable, so the origin can be shared
+    return clone.with_traceback(e.__traceback__)
+
+class KeyedBatcher:
+    """
+    Group items submitted for the same key within a short window and process
+    them in one call.
+
+    The first submitter for a key opens a batch; items submitted for that key
+    during the next window seconds (up to max_size items) join it. The batch
+    is then passed to the run_batch coroutine given by the submitter that
+    opened it, which returns one result per item, in order. A result that is
+    an exception instance is raised to that item's submitter only; if
+    run_batch itself raises, every submitter of the batch gets its own copy
+    of the error.
+    Batches of the same key never run concurrently.
+    """
+
+    def __init__(self, window: float, max_size: int = 0) -> None:
+        self._window = window
+        self._max_size = max_size
+        self._pending: dict[Hashable, _Batch] = {}
+        # One lock per key and event loop; keys are VM names, so this stays small
+        self._locks: dict[Hashable, tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, item: Any,
+                     run_batch: Callable[[list[Any]], Awaitable[list[Any]]]) -> Any:
+        """
+        Add item to the open batch for key (opening one if needed) and wait for its result.
+
+        Args:
+            key: Items with the same key are processed together
+            item: Work item passed to run_batch
+            run_batch: Coroutine function processing a list of items
+
+        Returns:
+            The result run_batch produced for item
+        """
+        loop = asyncio.get_running_loop()
+        batch: _Batch | None = self._pending.get(key)
+        # Futures cannot be awaited across event loops
+        if batch is None or batch.loop is not loop:
+            batch = _Batch(loop)
+            self._pending[key] = batch
+            task: asyncio.Task = loop.create_task(self._flush(key, batch, run_batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        future: asyncio.Future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if self._max_size and len(batch.items) >= self._max_size and self._pending.get(key) is batch:
+            # Full: later items open the next batch
+            del self._pending[key]
+        return await future
+
+    def _lock(self, key: Hashable, loop: asyncio.AbstractEventLoop) -> asyncio.Lock:
+        entry = self._locks.get(key)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Lock())
+            self._locks[key] = entry
+        return entry[1]
+
+    async def _flush(self, key: Hashable, batch: _Batch,
+                     run_batch: Callable[[list[Any]], Awaitable[list[Any]]]) -> None:
+        await asyncio.sleep(self._window)
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+
+        async with self._lock(key, batch.loop):
+            logger.debug("Running batch of %d item(s) for %s", len(batch.items), key)
+            try:
+                results: list[Any] = await run_batch(batch.items)
+            except BaseException as e:
+                for future in batch.futures:
+                    if future.done():
+                        continue
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(_fresh_exception(e))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return
+
+        for future, result in zip(batch.futures, results):
+            # Submitters that were cancelled no longer wait for their result
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
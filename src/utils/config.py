@@ -21,6 +21,12 @@ class Config:
     @property
     def APP_VERSION(self) -> str: return os.getenv("APP_VERSION", "")
 
+    @property
+    def WEB_CONCURRENCY(self) -> int: return int(os.getenv("WEB_CONCURRENCY", 1))
+
+    @property
+    def THREADPOOL_SIZE(self) -> int: return int(os.getenv("THREADPOOL_SIZE", 0))
+
     @property
     def LIBVIRT_SERVER_ADDRESS(self) -> str: return os.getenv("LIBVIRT_SERVER_ADDRESS", "")
 
@@ -34,6 +40,27 @@ class Config:
     def LIBVIRT_URI(self) -> str:
         return f"qemu+ssh://{self.LIBVIRT_SSH_USER}@{self.LIBVIRT_SERVER_ADDRESS}:{self.LIBVIRT_SERVER_PORT}/system"
 
+    @property
+    def LIBVIRT_POOL_MIN_SIZE(self) -> int: return int(os.getenv("LIBVIRT_POOL_MIN_SIZE", 0))
+
+    @property
+    def LIBVIRT_POOL_MAX_SIZE(self) -> int: return int(os.getenv("LIBVIRT_POOL_MAX_SIZE", 0))
+
+    @property
+    def LIBVIRT_POOL_ACQUIRE_TIMEOUT(self) -> float: return float(os.getenv("LIBVIRT_POOL_ACQUIRE_TIMEOUT", 0))
+
+    @property
+    def LIBVIRT_POOL_KEEPALIVE_INTERVAL(self) -> float: return float(os.getenv("LIBVIRT_POOL_KEEPALIVE_INTERVAL", 0))
+
+    @property
+    def DOMAIN_CACHE_TTL(self) -> float: return float(os.getenv("DOMAIN_CACHE_TTL", 0))
+
+    @property
+    def STORAGE_POOL_CACHE_TTL(self) -> float: return float(os.getenv("STORAGE_POOL_CACHE_TTL", 0))
+
+    @property
+    def DOMAIN_STATE_CACHE_TTL(self) -> float: return float(os.getenv("DOMAIN_STATE_CACHE_TTL", 0))
+
     @property
     def MAX_SCSI_DEVICES(self) -> int: return int(os.getenv("MAX_SCSI_DEVICES", 0))
 
@@ -47,12 +74,30 @@ class Config:
     @property
     def DISK_ATTACH_CONFIRM_DELAY(self) -> float: return float(os.getenv("DISK_ATTACH_CONFIRM_DELAY", 0))
 
+    @property
+    def DISK_ATTACH_COALESCE_WINDOW(self) -> float: return float(os.getenv("DISK_ATTACH_COALESCE_WINDOW", 0))
+
+    @property
+    def DISK_ATTACH_COALESCE_MAX(self) -> int: return int(os.getenv("DISK_ATTACH_COALESCE_MAX", 0))
+
     @property
     def DISK_DETACH_TIMEOUT(self) -> int: return int(os.getenv("DISK_DETACH_TIMEOUT", 0))
 
     @property
     def DISK_DETACH_POLL_INTERVAL(self) -> float: return float(os.getenv("DISK_DETACH_POLL_INTERVAL", 0))
 
+    @property
+    def DISK_DETACH_POLL_INITIAL(self) -> float: return float(os.getenv("DISK_DETACH_POLL_INITIAL", 0))
+
+    @property
+    def DISK_DETACH_POLL_BACKOFF(self) -> float: return float(os.getenv("DISK_DETACH_POLL_BACKOFF", 0))
+
+    @property
+    def DISK_DRIVER_IO(self) -> str: return os.getenv("DISK_DRIVER_IO", "")
+
+    @property
+    def DISK_DRIVER_DISCARD(self) -> str: return os.getenv("DISK_DRIVER_DISCARD", "")
+
     @property
     def LOG_LEVEL(self) -> str: return os.getenv("LOG_LEVEL", "")
 
@@ -4,4 +4,7 @@ COMMON_API_RESPONSES = {
     400: {"description": "Invalid request parameters"},
     404: {"description": "Not found"},
     500: {"description": "Internal server error"},
-}
\ No newline at end of file
+}
+
+# Body of the plain {"status": "success"} response, encoded once
+SUCCESS_BODY: bytes = b'{"status":"success"}'
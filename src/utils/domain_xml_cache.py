@@ -0,0 +1,84 @@
+import libvirt # type: ignore
+from lxml import etree # type: ignore
+import logging
+import threading
+from collections import OrderedDict
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Compatibility shim, see libvirt_utils
+if not hasattr(libvirt, 'VIR_DOMAIN_XML_LIVE'):
+    setattr(libvirt, 'VIR_DOMAIN_XML_LIVE', 1)
+
+# libvirt XML never needs network access, entity expansion, huge-tree support
+# or an xml:id index
+_XML_PARSER = etree.XMLParser(no_network=True, resolve_entities=False, huge_tree=False, collect_ids=False)
+
+# (uuid, XMLDesc flags) -> (XML text, parsed root) of the last fetch, most
+# recently used last. A fresh fetch that returns the same document (e.g.
+# between polls) reuses the parsed root instead of parsing it again. Bounded
+# to _XML_CACHE_MAX_ENTRIES; entries of undefined domains are dropped by
+# forget_domain_xml().
+_XML_CACHE: "OrderedDict[tuple[str, int], tuple[str, etree._Element]]" = OrderedDict()
+_XML_CACHE_MAX_ENTRIES: int = 256
+_xml_cache_lock = threading.Lock()
+
+def parse_domain_xml(dom: libvirt.virDomain, live: bool = True) -> etree._Element:
+    """
+    Parse domain XML configuration.
+
+    The XML is always fetched from libvirt. If it is identical to the last
+    document fetched for this domain, the tree parsed then is returned
+    instead of parsing it again, so the returned tree must be treated as
+    read-only.
+
+    Args:
+        dom: libvirt Domain object
+        live: Whether to get live configuration (default: True)
+
+    Returns:
+        etree._Element: Parsed XML root element
+
+    Raises:
+        etree.XMLSyntaxError: If XML parsing fails
+        libvirt.libvirtError: If unable to retrieve XML
+    """
+    # Called from polling loops: the VM name is only looked up on errors
+    flags: int = libvirt.VIR_DOMAIN_XML_LIVE if live else 0
+    key: tuple[str, int] = (dom.UUIDString(), flags)
+    with _xml_cache_lock:
+        entry = _XML_CACHE.get(key)
+
+    try:
+        xml_desc: str = dom.XMLDesc(flags)
+        if entry is not None and entry[0] == xml_desc:
+            # Unchanged document (e.g. between polls): the parsed tree is still exact
+            logger.debug("XML for VM %s (live=%s) unchanged, reusing parsed tree", key[0], live)
+            root: etree._Element = entry[1]
+        else:
+            logger.debug("Parsing XML for VM %s (live=%s)", key[0], live)
+            root = etree.fromstring(xml_desc.encode(), parser=_XML_PARSER)
+    except etree.XMLSyntaxError as e:
+        logger.error("Failed to parse VM XML for '%s': %s", dom.name(), e)
+        raise
+    except libvirt.libvirtError as e:
+        logger.error("Failed to retrieve VM XML for '%s': %s", dom.name(), e)
+        raise
+
+    with _xml_cache_lock:
+        _XML_CACHE[key] = (xml_desc, root)
+        _XML_CACHE.move_to_end(key)
+        while len(_XML_CACHE) > _XML_CACHE_MAX_ENTRIES:
+            _XML_CACHE.popitem(last=False)
+    return root
+
+def forget_domain_xml(uuid: str) -> None:
+    """
+    Drop the stored documents of a domain, e.g. once it is undefined.
+
+    Args:
+        uuid: UUID of the domain
+    """
+    with _xml_cache_lock:
+        for key in [key for key in _XML_CACHE if key[0] == uuid]:
+            del _XML_CACHE[key]
@@ -6,26 +6,53 @@ from fastapi.responses import JSONResponse # type: ignore
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# libvirt error code -> HTTP status; codes not listed map to 500
+_LIBVIRT_ERR_TO_HTTP: dict[int, int] = {
+    libvirt.VIR_ERR_NO_DOMAIN: status.HTTP_404_NOT_FOUND,
+    libvirt.VIR_ERR_NO_STORAGE_POOL: status.HTTP_404_NOT_FOUND,
+    libvirt.VIR_ERR_NO_STORAGE_VOL: status.HTTP_404_NOT_FOUND,
+    libvirt.VIR_ERR_OPERATION_INVALID: status.HTTP_409_CONFLICT,
+    libvirt.VIR_ERR_STORAGE_VOL_EXIST: status.HTTP_409_CONFLICT,
+}
+
 async def libvirt_error_handler(request: Request, exc: libvirt.libvirtError):
     """
     Custom exception handler for libvirt.libvirtError.
     
-    Translates specific libvirt errors into appropriate HTTP responses.
+    Translates libvirt error codes into appropriate HTTP responses.
     """
     error_msg = str(exc)
-    logger.error(f"Libvirt error caught by handler: {error_msg}")
+    logger.error("Libvirt error caught by handler: %s", error_msg)
 
-    if "Domain not found" in error_msg:
-        detail = f"The specified VM was not found."
-        status_code = status.HTTP_404_NOT_FOUND
+    error_code: int | None = exc.get_error_code()
+    status_code: int = _LIBVIRT_ERR_TO_HTTP.get(error_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if error_code == libvirt.VIR_ERR_NO_DOMAIN:
+        detail = "The specified VM was not found."
+    elif status_code != status.HTTP_500_INTERNAL_SERVER_ERROR:
+        detail = error_msg
     elif "already in use" in error_msg or "Target device" in error_msg:
+        # Device conflicts from hot-plug are reported with generic error codes
         detail = error_msg
         status_code = status.HTTP_409_CONFLICT
     else:
         detail = f"An internal libvirt error occurred: {error_msg}"
-        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         
     return JSONResponse(
         status_code=status_code,
         content={"detail": detail},
-    )
\ No newline at end of file
+    )
+
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """
+    Fallback exception handler for errors no endpoint handles itself.
+
+    Logs which request failed and returns a generic 500, so endpoints only
+    need to catch the exceptions they translate. The traceback is not logged
+    here: Starlette re-raises the exception after this handler runs, and the
+    server logs it then.
+    """
+    logger.error("Unhandled error on %s %s: %r", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": "Internal Server Error"},
+    )
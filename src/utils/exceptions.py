@@ -4,6 +4,10 @@ class VMNotFound(Exception):
     """Raised when a specified virtual machine is not found."""
     pass
 
+class VMNotRunning(Exception):
+    """Raised when an operation requires a running virtual machine."""
+    pass
+
 class DiskNotFound(Exception):
     """Raised when a specified disk is not found on a VM."""
     pass
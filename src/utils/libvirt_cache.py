@@ -0,0 +1,205 @@
+import libvirt # type: ignore
+import logging
+import threading
+import time
+import weakref
+from src.utils.config import config
+from src.utils.domain_xml_cache import forget_domain_xml
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# (id(conn), vm_name) -> (conn, domain, expiry). Holding the connection keeps
+# its id from being reused by another connection while the entry lives;
+# forget_connection() drops the entries when the connection is closed.
+_DOMAIN_CACHE: dict[tuple[int, str], tuple[libvirt.virConnect, libvirt.virDomain, float]] = {}
+_domain_cache_lock = threading.Lock()
+
+# vm_name -> UUID, so lookups after the first use the hash-indexed UUID lookup.
+# A UUID only changes when a VM is undefined and defined again.
+_NAME_TO_UUID: dict[str, str] = {}
+
+# (id(conn), pool_name) -> (conn, pool, expiry), like _DOMAIN_CACHE
+_POOL_CACHE: dict[tuple[int, str], tuple[libvirt.virConnect, libvirt.virStoragePool, float]] = {}
+
+# UUID -> (state, expiry). Every lifecycle event of the domain drops its entry.
+_STATE_CACHE: dict[str, tuple[int, float]] = {}
+
+# Connections that already have the lifecycle invalidation callback registered
+_registered_conns: "weakref.WeakSet[libvirt.virConnect]" = weakref.WeakSet()
+
+_INVALIDATING_EVENTS: frozenset[int] = frozenset((
+    libvirt.VIR_DOMAIN_EVENT_DEFINED,
+    libvirt.VIR_DOMAIN_EVENT_UNDEFINED,
+    libvirt.VIR_DOMAIN_EVENT_STARTED,
+    libvirt.VIR_DOMAIN_EVENT_STOPPED,
+))
+
+_DEFINITION_EVENTS: frozenset[int] = frozenset((
+    libvirt.VIR_DOMAIN_EVENT_DEFINED,
+    libvirt.VIR_DOMAIN_EVENT_UNDEFINED,
+))
+
+def _on_lifecycle_event(conn: libvirt.virConnect, dom: libvirt.virDomain, event: int, detail: int, opaque: object) -> None:
+    _STATE_CACHE.pop(dom.UUIDString(), None)
+    if event == libvirt.VIR_DOMAIN_EVENT_UNDEFINED:
+        forget_domain_xml(dom.UUIDString())
+    if event in _INVALIDATING_EVENTS:
+        logger.debug("Lifecycle event %s for VM '%s', dropping cached lookup", event, dom.name())
+        invalidate_domain(dom.name(), forget_uuid=event in _DEFINITION_EVENTS)
+
+def _on_pool_lifecycle_event(conn: libvirt.virConnect, pool: libvirt.virStoragePool, event: int, detail: int, opaque: object) -> None:
+    logger.debug("Lifecycle event %s for storage pool '%s', dropping cached lookup", event, pool.name())
+    invalidate_storage_pool(pool.name())
+
+def _register_lifecycle_invalidation(conn: libvirt.virConnect) -> None:
+    """Register the domain and storage pool lifecycle callbacks on a connection (once per connection)."""
+    with _domain_cache_lock:
+        if conn in _registered_conns:
+            return
+        _registered_conns.add(conn)
+    try:
+        conn.domainEventRegisterAny(None, libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE, _on_lifecycle_event, None)
+        conn.storagePoolEventRegisterAny(None, libvirt.VIR_STORAGE_POOL_EVENT_ID_LIFECYCLE, _on_pool_lifecycle_event, None)
+    except libvirt.libvirtError as e:
+        # Entries still expire after DOMAIN_CACHE_TTL/STORAGE_POOL_CACHE_TTL
+        logger.warning("Could not register lifecycle events for lookup cache invalidation: %s", e)
+
+def get_domain(conn: libvirt.virConnect, vm_name: str) -> libvirt.virDomain:
+    """
+    Look up a domain by name, reusing a recent lookup on the same connection.
+
+    Entries expire after DOMAIN_CACHE_TTL seconds and are dropped as soon as
+    libvirt reports the domain was defined, undefined, started or stopped.
+    Once a VM's UUID is known, fresh lookups go through lookupByUUIDString.
+
+    Args:
+        conn: libvirt connection
+        vm_name: Name of the VM
+
+    Returns:
+        libvirt.virDomain: Domain object
+
+    Raises:
+        libvirt.libvirtError: If the VM does not exist
+    """
+    key: tuple[int, str] = (id(conn), vm_name)
+    now: float = time.monotonic()
+    with _domain_cache_lock:
+        entry = _DOMAIN_CACHE.get(key)
+    if entry is not None and entry[0] is conn and entry[2] > now:
+        return entry[1]
+
+    _register_lifecycle_invalidation(conn)
+    dom: libvirt.virDomain = _lookup_domain(conn, vm_name)
+    with _domain_cache_lock:
+        _DOMAIN_CACHE[key] = (conn, dom, now + config.DOMAIN_CACHE_TTL)
+    return dom
+
+def _lookup_domain(conn: libvirt.virConnect, vm_name: str) -> libvirt.virDomain:
+    """Look up a domain by its known UUID, falling back to a lookup by name."""
+    uuid: str | None = _NAME_TO_UUID.get(vm_name)
+    if uuid is not None:
+        try:
+            return conn.lookupByUUIDString(uuid)
+        except libvirt.libvirtError as e:
+            if e.get_error_code() != libvirt.VIR_ERR_NO_DOMAIN:
+                raise
+            # Undefined (and possibly redefined under a new UUID) since it was mapped
+            _NAME_TO_UUID.pop(vm_name, None)
+    dom: libvirt.virDomain = conn.lookupByName(vm_name)
+    _NAME_TO_UUID[vm_name] = dom.UUIDString()
+    return dom
+
+def invalidate_domain(vm_name: str, forget_uuid: bool = False) -> None:
+    """
+    Drop cached lookups of a VM on all connections.
+
+    Args:
+        vm_name: Name of the VM
+        forget_uuid: Also forget the VM's UUID (it was defined or undefined)
+    """
+    if forget_uuid:
+        _NAME_TO_UUID.pop(vm_name, None)
+    with _domain_cache_lock:
+        for key in [key for key in _DOMAIN_CACHE if key[1] == vm_name]:
+            del _DOMAIN_CACHE[key]
+
+def get_storage_pool(conn: libvirt.virConnect, pool_name: str) -> libvirt.virStoragePool:
+    """
+    Look up a storage pool by name, reusing a recent lookup on the same connection.
+
+    Entries expire after STORAGE_POOL_CACHE_TTL seconds and are dropped as
+    soon as libvirt reports a lifecycle event for the pool.
+
+    Args:
+        conn: libvirt connection
+        pool_name: Name of the storage pool
+
+    Returns:
+        libvirt.virStoragePool: Storage pool object
+
+    Raises:
+        libvirt.libvirtError: If the pool does not exist
+    """
+    key: tuple[int, str] = (id(conn), pool_name)
+    now: float = time.monotonic()
+    with _domain_cache_lock:
+        entry = _POOL_CACHE.get(key)
+    if entry is not None and entry[0] is conn and entry[2] > now:
+        return entry[1]
+
+    _register_lifecycle_invalidation(conn)
+    pool: libvirt.virStoragePool = conn.storagePoolLookupByName(pool_name)
+    with _domain_cache_lock:
+        _POOL_CACHE[key] = (conn, pool, now + config.STORAGE_POOL_CACHE_TTL)
+    return pool
+
+def invalidate_storage_pool(pool_name: str) -> None:
+    """Drop cached lookups of a storage pool on all connections."""
+    with _domain_cache_lock:
+        for key in [key for key in _POOL_CACHE if key[1] == pool_name]:
+            del _POOL_CACHE[key]
+
+def forget_connection(conn: libvirt.virConnect) -> None:
+    """
+    Drop every cached domain and storage pool lookup made on a connection.
+
+    Must be called when the connection is closed, so its entries neither keep
+    the closed connection alive nor get hit by a later connection that
+    happens to reuse its id().
+
+    Args:
+        conn: libvirt connection that is being closed
+    """
+    conn_id: int = id(conn)
+    with _domain_cache_lock:
+        for cache in (_DOMAIN_CACHE, _POOL_CACHE):
+            for key in [key for key, entry in cache.items() if key[0] == conn_id and entry[0] is conn]:
+                del cache[key]
+
+def get_domain_state(dom: libvirt.virDomain) -> int:
+    """
+    Return the state of a domain (e.g. VIR_DOMAIN_RUNNING), reusing a recent read.
+
+    Entries expire after DOMAIN_STATE_CACHE_TTL seconds and are dropped on
+    any lifecycle event of the domain. Only valid for domains obtained
+    through get_domain(), which registers the lifecycle callback.
+
+    Args:
+        dom: libvirt Domain object
+
+    Returns:
+        int: libvirt domain state
+
+    Raises:
+        libvirt.libvirtError: If the state cannot be read
+    """
+    uuid: str = dom.UUIDString()
+    now: float = time.monotonic()
+    entry = _STATE_CACHE.get(uuid)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    state: int = dom.state()[0]
+    _STATE_CACHE[uuid] = (state, now + config.DOMAIN_STATE_CACHE_TTL)
+    return state
@@ -0,0 +1,98 @@
+import libvirt # type: ignore
+import logging
+import threading
+import time
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_event_loop_lock = threading.Lock()
+_event_loop_thread: threading.Thread | None = None
+
+def _run_event_loop() -> None:
+    """Dispatch libvirt events forever (runs in a daemon thread)."""
+    while True:
+        try:
+            libvirt.virEventRunDefaultImpl()
+        except libvirt.libvirtError as e:
+            logger.error("libvirt event loop iteration failed: %s", e)
+            time.sleep(1)
+
+def start_event_loop() -> None:
+    """
+    Register libvirt's default event loop and start dispatching it.
+
+    Events are only delivered on connections opened after the event loop is
+    registered, so this must be called before opening any connection.
+    Subsequent calls are no-ops.
+    """
+    global _event_loop_thread
+    with _event_loop_lock:
+        if _event_loop_thread is not None:
+            return
+        libvirt.virEventRegisterDefaultImpl()
+        _event_loop_thread = threading.Thread(target=_run_event_loop, name="libvirt-event-loop", daemon=True)
+        _event_loop_thread.start()
+        logger.debug("libvirt event loop started")
+
+class DeviceEventWaiter:
+    """
+    Context manager that wakes a polling loop when a domain device event fires.
+
+    Use wait(timeout) in place of time.sleep(timeout) between checks of the
+    domain configuration: it returns as soon as libvirt reports the event
+    (e.g. VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED) instead of sleeping the full
+    interval. If the callback cannot be registered it behaves like a sleep,
+    so callers still converge through polling.
+
+    With alias set, only events for that device alias (the <alias name>
+    of the device in the live XML) wake the waiter, so a wake-up means that
+    device changed.
+
+    Enter the context before issuing the device change so the event cannot
+    be missed.
+    """
+
+    def __init__(self, dom: libvirt.virDomain, event_id: int, alias: str | None = None) -> None:
+        self._dom = dom
+        self._event_id = event_id
+        self.alias = alias
+        self._event = threading.Event()
+        self._conn: libvirt.virConnect | None = None
+        self._callback_id: int | None = None
+
+    def __enter__(self) -> "DeviceEventWaiter":
+        try:
+            self._conn = self._dom.connect()
+            self._callback_id = self._conn.domainEventRegisterAny(self._dom, self._event_id, self._on_event, None)
+        except libvirt.libvirtError as e:
+            logger.warning("Could not register device event %s, falling back to polling: %s", self._event_id, e)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._conn is not None and self._callback_id is not None:
+            try:
+                self._conn.domainEventDeregisterAny(self._callback_id)
+            except libvirt.libvirtError as e:
+                logger.warning("Failed to deregister device event callback: %s", e)
+        self._callback_id = None
+
+    @property
+    def registered(self) -> bool:
+        """Whether the event callback is registered (False means wait() only sleeps)."""
+        return self._callback_id is not None
+
+    def _on_event(self, conn: libvirt.virConnect, dom: libvirt.virDomain, dev_alias: str, opaque: object) -> None:
+        logger.debug("Device event %s received for alias '%s'", self._event_id, dev_alias)
+        if self.alias is None or dev_alias == self.alias:
+            self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait until the next device event or until timeout elapses.
+
+        Returns:
+            bool: True if woken by an event, False on timeout
+        """
+        woken: bool = self._event.wait(timeout)
+        self._event.clear()
+        return woken
@@ -1,7 +1,17 @@
 import libvirt # type: ignore
-import xml.etree.ElementTree as ET
+from lxml import etree # type: ignore
+from anyio import to_thread # type: ignore
+import asyncio
+import atexit
 import logging
+import queue
+import threading
+from typing import AsyncIterator
 from src.utils.config import config
+from src.utils.libvirt_events import start_event_loop
+from src.utils.libvirt_cache import forget_connection
+# Also applies the VIR_DOMAIN_XML_LIVE compatibility shim
+from src.utils.domain_xml_cache import parse_domain_xml
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -20,12 +30,19 @@ if not hasattr(libvirt, 'VIR_DOMAIN_AFFECT_LIVE'):
 if not hasattr(libvirt, 'VIR_DOMAIN_AFFECT_CONFIG'):
     setattr(libvirt, 'VIR_DOMAIN_AFFECT_CONFIG', 2)
 
-if not hasattr(libvirt, 'VIR_DOMAIN_XML_LIVE'):
-    setattr(libvirt, 'VIR_DOMAIN_XML_LIVE', 1)
-
 LIBVIRT_DOMAIN_NAMESPACE = "http://libvirt.org/schemas/domain/1.0"
 NAMESPACES = {'lib': LIBVIRT_DOMAIN_NAMESPACE}
 
+# Target device names of SCSI disks, evaluated in a single libxml2 traversal
+_SCSI_DISK_DEVS_XPATH = etree.XPath(
+    "./devices/disk/target[@bus='scsi' or starts-with(@dev, 'sd')]/@dev",
+    smart_strings=False,
+)
+
+# Process-wide connection pool shared by all requests (see get_connection_pool)
+_pool: "LibvirtPool | None" = None
+_pool_lock = threading.Lock()
+
 def get_libvirt_connection() -> libvirt.virConnect:
     """
     Establish libvirt connection.
@@ -41,8 +58,11 @@ def get_libvirt_connection() -> libvirt.virConnect:
     Note:
         Caller is responsible for closing the connection when done.
     """
-    logger.info(f"Establishing libvirt connection using URI: {config.LIBVIRT_URI}")
+    logger.info("Establishing libvirt connection using URI: %s", config.LIBVIRT_URI)
     
+    # Device events are only delivered on connections opened after this
+    start_event_loop()
+
     try:
         conn: libvirt.virConnect = libvirt.open(config.LIBVIRT_URI)
         if conn is None:
@@ -50,69 +70,293 @@ def get_libvirt_connection() -> libvirt.virConnect:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
         
-        logger.debug(f"Libvirt connection established successfully")
+        logger.debug("Libvirt connection established successfully")
         return conn
         
     except Exception as e:
-        logger.error(f"Unexpected error connecting to libvirt: {e}")
+        logger.error("Unexpected error connecting to libvirt: %s", e)
         raise RuntimeError(f"Unexpected error: {e}")
 
-def get_connection_dependency() -> libvirt.virConnect:
+class LibvirtPool:
+    """
+    Bounded pool of libvirt connections.
+
+    Connections are opened on demand up to max_size and handed back to the
+    pool after each request, so the connect/authentication handshake is paid
+    once per connection instead of once per request. prefill() opens
+    min_size connections up front and check_idle() probes idle connections
+    so dead ones are evicted before a request picks them up. Idle
+    connections are also checked with isAlive() before reuse.
+
+    The pool is thread-safe: blocking libvirt work runs in worker threads and
+    requests may be served from different event loops. Requests take
+    connections with acquire_async(), which waits for a free connection on
+    the event loop instead of in a worker thread.
     """
-    FastAPI dependency to manage the libvirt connection lifecycle.
+
+    def __init__(self, min_size: int, max_size: int, acquire_timeout: float | None = None) -> None:
+        self.min_size: int = min_size
+        self.max_size: int = max(max_size, min_size, 1)
+        self.acquire_timeout: float | None = acquire_timeout
+        # LIFO keeps the most recently used (warmest) connections in rotation
+        self._idle: queue.LifoQueue[libvirt.virConnect] = queue.LifoQueue()
+        self._size: int = 0  # Open connections, idle or in use
+        self._lock = threading.Lock()
+        self._closed: bool = False
+        # Event loop and its semaphore of max_size slots, see acquire_async()
+        self._slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+        # id(conn) -> semaphore its slot was taken from, for connections from acquire_async()
+        self._slot_of: dict[int, asyncio.Semaphore] = {}
+
+    def _reserve_slot(self) -> bool:
+        with self._lock:
+            if self._size >= self.max_size:
+                return False
+            self._size += 1
+            return True
+
+    def _discard(self, conn: libvirt.virConnect) -> None:
+        with self._lock:
+            self._size -= 1
+        forget_connection(conn)
+        try:
+            conn.close()
+        except libvirt.libvirtError as e:
+            logger.warning("Failed to close libvirt connection: %s", e)
+
+    def _open(self) -> libvirt.virConnect:
+        try:
+            return get_libvirt_connection()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+            raise
+
+    def acquire(self) -> libvirt.virConnect:
+        """
+        Take a live connection from the pool, opening one if below max_size.
+
+        Returns:
+            libvirt.virConnect: Connection object, to be given back with release()
+
+        Raises:
+            RuntimeError: If the pool is closed, a connection cannot be opened,
+                or none becomes free within acquire_timeout
+        """
+        while True:
+            if self._closed:
+                raise RuntimeError("Libvirt connection pool is closed")
+            try:
+                conn: libvirt.virConnect = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_slot():
+                    return self._open()
+                try:
+                    conn = self._idle.get(timeout=self.acquire_timeout)
+                except queue.Empty:
+                    raise RuntimeError(f"No libvirt connection available after {self.acquire_timeout}s")
+            if conn.isAlive():
+                return conn
+            logger.warning("Pooled libvirt connection is no longer alive, replacing it.")
+            self._discard(conn)
+
+    def _loop_slots(self) -> asyncio.Semaphore:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        slots = self._slots
+        # Semaphores cannot be shared across event loops
+        if slots is None or slots[0] is not loop:
+            slots = (loop, asyncio.Semaphore(self.max_size))
+            self._slots = slots
+        return slots[1]
+
+    async def acquire_async(self) -> libvirt.virConnect:
+        """
+        Take a live connection from the pool without tying up a worker thread while waiting.
+
+        At most max_size callers hold a slot at a time, and only a slot holder
+        runs acquire() in the threadpool, where a connection is then free or
+        can be opened. Waiting for a slot happens on the event loop, so
+        requests queued for a connection never hold the threadpool tokens
+        that requests with a connection need for their libvirt calls.
+
+        Returns:
+            libvirt.virConnect: Connection object, to be given back with release_async()
+
+        Raises:
+            RuntimeError: If the pool is closed, a connection cannot be opened,
+                or no slot becomes free within acquire_timeout
+        """
+        slots: asyncio.Semaphore = self._loop_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"No libvirt connection available after {self.acquire_timeout}s")
+        try:
+            conn: libvirt.virConnect = await to_thread.run_sync(self.acquire)
+        except BaseException:
+            slots.release()
+            raise
+        # The loop's semaphore may be replaced while conn is in use; the slot
+        # goes back to the one it was taken from
+        with self._lock:
+            self._slot_of[id(conn)] = slots
+        return conn
+
+    async def release_async(self, conn: libvirt.virConnect) -> None:
+        """Give back a connection taken with acquire_async(), freeing its slot."""
+        with self._lock:
+            slots: asyncio.Semaphore = self._slot_of.pop(id(conn))
+        try:
+            self.release(conn)
+        finally:
+            slots.release()
+
+    def prefill(self) -> int:
+        """
+        Open connections until min_size are open.
+
+        Returns:
+            int: Number of connections opened
+
+        Raises:
+            RuntimeError: If a connection cannot be opened
+        """
+        opened: int = 0
+        while not self._closed and self._size < self.min_size and self._reserve_slot():
+            self.release(self._open())
+            opened += 1
+        return opened
+
+    def check_idle(self) -> int:
+        """
+        Probe every idle connection with getVersion() and evict the dead ones.
+
+        Returns:
+            int: Number of connections evicted
+        """
+        idle: list[libvirt.virConnect] = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        evicted: int = 0
+        # Oldest first, so the warmest connection ends up on top of the LIFO again
+        for conn in reversed(idle):
+            try:
+                conn.getVersion()
+            except libvirt.libvirtError as e:
+                logger.warning("Evicting stale libvirt connection: %s", e)
+                self._discard(conn)
+                evicted += 1
+            else:
+                self.release(conn)
+        return evicted
+
+    def release(self, conn: libvirt.virConnect) -> None:
+        """Give a connection back to the pool (closes it if the pool is closed)."""
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def close_all(self) -> None:
+        """Close idle connections; connections still in use are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        logger.debug("Libvirt connection pool closed.")
+
+def get_connection_pool() -> LibvirtPool:
+    """
+    Get the process-wide libvirt connection pool, creating it on first use.
+
+    Returns:
+        LibvirtPool: Shared pool sized by LIBVIRT_POOL_MIN_SIZE/LIBVIRT_POOL_MAX_SIZE
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LibvirtPool(
+                min_size=config.LIBVIRT_POOL_MIN_SIZE,
+                max_size=config.LIBVIRT_POOL_MAX_SIZE,
+                acquire_timeout=config.LIBVIRT_POOL_ACQUIRE_TIMEOUT or None,
+            )
+        return _pool
+
+def close_connection_pool() -> None:
+    """Close the process-wide connection pool, if it was created."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close_all()
+
+atexit.register(close_connection_pool)
+
+def maintain_connection_pool() -> None:
+    """
+    Evict dead idle connections and top the pool back up to min_size.
+
+    Runs at startup and then periodically (LIBVIRT_POOL_KEEPALIVE_INTERVAL).
+    Failing to open connections is only logged: the pool still opens them
+    on demand once libvirt is reachable again.
+    """
+    pool: LibvirtPool = get_connection_pool()
+    evicted: int = pool.check_idle()
+    try:
+        opened: int = pool.prefill()
+    except RuntimeError as e:
+        logger.warning("Could not open libvirt connections for the pool: %s", e)
+        return
+    if evicted or opened:
+        logger.info("Libvirt connection pool maintenance: evicted %s, opened %s", evicted, opened)
+
+async def get_connection_dependency() -> AsyncIterator[libvirt.virConnect]:
+    """
+    FastAPI dependency providing a pooled libvirt connection.
 
     Yields:
         libvirt.virConnect: An active libvirt connection object.
     
     Note:
-        This generator function establishes a connection and yields it to the
-        request handler. The 'finally' block ensures the connection is
-        always closed, even if errors occur during the request.
+        The connection is returned to the pool when the request completes.
+        Waiting for a free connection happens on the event loop, so it
+        neither blocks the loop nor holds a threadpool token.
     """
-    logger.debug("Dependency: acquiring libvirt connection.")
-    conn: libvirt.virConnect | None = None
+    logger.debug("Dependency: acquiring pooled libvirt connection.")
+    pool: LibvirtPool = get_connection_pool()
+    conn: libvirt.virConnect = await pool.acquire_async()
     try:
-        conn = get_libvirt_connection()
         yield conn
     finally:
-        if conn:
-            conn.close()
-            logger.debug("Dependency: libvirt connection closed.")
+        await pool.release_async(conn)
 
-def parse_domain_xml(dom: libvirt.virDomain, live: bool = True) -> ET.Element:
-    """
-    Parse domain XML configuration.
-    
-    Args:
-        dom: libvirt Domain object
-        live: Whether to get live configuration (default: True)
-        
-    Returns:
-        ET.Element: Parsed XML root element
-        
-    Raises:
-        ET.ParseError: If XML parsing fails
-        libvirt.libvirtError: If unable to retrieve XML
-    """
-    vm_name: str = dom.name()
-    logger.debug(f"Parsing XML for VM '{vm_name}' (live={live})")
-    
-    try:
-        flags: int = libvirt.VIR_DOMAIN_XML_LIVE if live else 0
-        xml_desc: str = dom.XMLDesc(flags)
-        root: ET.Element = ET.fromstring(xml_desc)
-        logger.debug(f"Successfully parsed XML for VM '{vm_name}' : {root}")
-        return root
-        
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse VM XML for '{vm_name}': {e}")
-        raise
-    except libvirt.libvirtError as e:
-        logger.error(f"Failed to retrieve VM XML for '{vm_name}': {e}")
-        raise
+def _compute_letters(n: int) -> str:
+    """Convert 0-indexed integer to letter sequence (uncached)."""
+    res: str = ""
+    while True:
+        res = chr(ord('a') + (n % 26)) + res
+        n //= 26
+        if n == 0:
+            break
+        n -= 1
+    return res
+
+# Every one- and two-letter suffix (a..zz), covering any realistic SCSI device count
+_INT_TO_LETTERS: tuple[str, ...] = tuple(_compute_letters(i) for i in range(703))
+_LETTERS_TO_INT: dict[str, int] = {letters: i for i, letters in enumerate(_INT_TO_LETTERS)}
+# Full SCSI device names for the same range, so allocation does no string building
+_SCSI_DEV_NAMES: tuple[str, ...] = tuple(f"sd{letters}" for letters in _INT_TO_LETTERS)
 
 def _letters_to_int(s: str) -> int:
     """Convert letter sequence to 0-indexed integer."""
+    cached: int | None = _LETTERS_TO_INT.get(s)
+    if cached is not None:
+        return cached
     res: int = 0
     for char in s:
         res = res * 26 + (ord(char) - ord('a') + 1)
@@ -120,49 +364,82 @@ def _letters_to_int(s: str) -> int:
 
 def _int_to_letters(n: int) -> str:
     """Convert 0-indexed integer to letter sequence."""
-    res: str = ""
-    while True:
-        res = chr(ord('a') + (n % 26)) + res
-        n //= 26
-        if n == 0:
-            break
-        n -= 1
-    return res
+    if 0 <= n < len(_INT_TO_LETTERS):
+        return _INT_TO_LETTERS[n]
+    return _compute_letters(n)
 
-def get_next_available_scsi_dev(dom: libvirt.virDomain) -> str:
+def _scsi_dev_name(i: int) -> str:
+    """SCSI device name for a 0-indexed slot (0 -> sda)."""
+    return _SCSI_DEV_NAMES[i] if i < len(_SCSI_DEV_NAMES) else f"sd{_compute_letters(i)}"
+
+def get_next_available_scsi_devs(dom: libvirt.virDomain, count: int,
+                                 root: etree._Element | None = None) -> list[str]:
     """
-    Find the next available SCSI disk target device name (e.g., sdb, sdc)
-    for use with virtio-scsi controller.
+    Find several free SCSI disk target device names from a single read of
+    the domain XML, for attaching multiple disks in one request.
+
+    Slots after the highest device in use are preferred (in order); gaps left
+    by detached disks are used once those run out.
 
     Args:
         dom: libvirt Domain object representing the VM.
+        count: Number of device names to return.
+        root: Already-parsed live domain XML; fetched if omitted.
 
     Returns:
-        str: The next available SCSI disk device name.
+        list[str]: Free SCSI disk device names, in allocation order.
 
     Raises:
-        RuntimeError: If no available device name is found.
+        RuntimeError: If fewer than count device names are available.
     """
     vm_name: str = dom.name()
-    logger.info(f"Finding next available SCSI device for VM '{vm_name}'")
+    logger.info("Finding %s available SCSI device(s) for VM '%s'", count, vm_name)
 
-    root: ET.Element = parse_domain_xml(dom, live=True)
-    used_devices: set[str] = set()
+    if root is None:
+        root = parse_domain_xml(dom, live=True)
+    max_devices: int = config.MAX_SCSI_DEVICES
+    # Bit i set <=> sd<letters(i)> is in use, for i < max_devices
+    used_mask: int = 0
+    max_used_index: int = -1
 
-    for disk in root.findall(".//devices/disk"):
-        target: ET.Element | None = disk.find("target")
-        bus: str | None = disk.get("bus") or (target.get("bus") if target is not None else None)
-        dev: str | None = target.get("dev") if target is not None else None
+    for dev in _SCSI_DISK_DEVS_XPATH(root):
+        suffix: str = dev[2:]
+        if dev.startswith("sd") and suffix.isascii() and suffix.isalpha() and suffix.islower():
+            index: int = _letters_to_int(suffix)
+            max_used_index = max(max_used_index, index)
+            if index < max_devices:
+                used_mask |= 1 << index
 
-        if dev and (bus == "scsi" or dev.startswith("sd")):
-            used_devices.add(dev)
+    # Devices after the highest one in use first; all of them are free
+    next_index: int = max_used_index + 1
+    free_devices: list[str] = [_scsi_dev_name(i) for i in range(next_index, min(next_index + count, max_devices))]
 
-    for i in range(config.MAX_SCSI_DEVICES):
-        suffix: str = _int_to_letters(i)
-        proposed_dev: str = f"sd{suffix}"
+    # Then gaps left by detached disks, lowest first
+    gaps: int = ~used_mask & ((1 << min(next_index, max_devices)) - 1)
+    while gaps and len(free_devices) < count:
+        lowest: int = gaps & -gaps
+        free_devices.append(_scsi_dev_name(lowest.bit_length() - 1))
+        gaps ^= lowest
 
-        if proposed_dev not in used_devices:
-            logger.info(f"Next available SCSI device for VM '{vm_name}': {proposed_dev}")
-            return proposed_dev
+    if len(free_devices) == count:
+        logger.info("Next available SCSI device(s) for VM '%s': %s", vm_name, free_devices)
+        return free_devices
 
-    raise RuntimeError(f"No available SCSI device names found (checked {config.MAX_SCSI_DEVICES} possibilities)")
+    raise RuntimeError(f"No available SCSI device names found (checked {max_devices} possibilities)")
+
+def get_next_available_scsi_dev(dom: libvirt.virDomain, root: etree._Element | None = None) -> str:
+    """
+    Find the next available SCSI disk target device name (e.g., sdb, sdc)
+    for use with virtio-scsi controller.
+
+    Args:
+        dom: libvirt Domain object representing the VM.
+        root: Already-parsed live domain XML; fetched if omitted.
+
+    Returns:
+        str: The next available SCSI disk device name.
+
+    Raises:
+        RuntimeError: If no available device name is found.
+    """
+    return get_next_available_scsi_devs(dom, 1, root=root)[0]
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight await the same result (or exception) instead of repeating it.
+    Nothing is cached: once the call completes, the next caller runs it again.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() for key, or join the call already in flight for key.
+
+        Args:
+            key: Identifies equivalent calls
+            fn: Coroutine factory doing the work
+
+        Returns:
+            The result of fn()
+        """
+        loop = asyncio.get_running_loop()
+        in_flight: asyncio.Future | None = self._calls.get(key)
+        # Futures cannot be awaited across event loops
+        if in_flight is not None and in_flight.get_loop() is loop:
+            logger.debug("Joining in-flight call for %s", key)
+            # Shielded so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future = loop.create_future()
+        self._calls[key] = future
+        try:
+            result: T = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved: there may be no waiters to consume it
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
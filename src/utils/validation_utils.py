@@ -4,6 +4,11 @@ from typing import Optional
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Compiled once at import instead of on every validation call. fullmatch,
+# unlike match with $, does not accept a trailing newline.
+_NAME_FULLMATCH = re.compile(r'[a-zA-Z0-9_.-]+').fullmatch
+_TARGET_DEV_FULLMATCH = re.compile(r'[vs]d[a-z]+').fullmatch
+
 def validate_size_gb(size_gb: int) -> int:
     """
     Validate size in GB for storage volumes.
@@ -43,7 +48,7 @@ def validate_name(name: str, type_name: str = "Name") -> str:
         logger.error(msg)
         raise ValueError(msg)
 
-    if not re.match(r'^[a-zA-Z0-9_.-]+$', name):
+    if not _NAME_FULLMATCH(name):
         raise ValueError(f'{type_name} must contain only alphanumeric characters, hyphens, underscores, and periods')
     if len(name) > 255:
         raise ValueError(f'{type_name} must be 255 characters or less')
@@ -69,7 +74,7 @@ def validate_target_device(target_dev: Optional[str]) -> str | None:
     if not isinstance(target_dev, str):
         raise ValueError('Target device must be a string')
     
-    if not re.match(r'^[vs]d[a-z]+$', target_dev):
+    if not _TARGET_DEV_FULLMATCH(target_dev):
         raise ValueError('Target device must follow format vd[a-z]+ or sd[a-z]+ (e.g., vda, sdb)')
     
     return target_dev
@@ -0,0 +1,62 @@
+import asyncio
+from src.utils.batcher import KeyedBatcher
+
+def test_items_in_window_are_processed_together():
+    """Test items submitted for the same key within the window form one batch."""
+    batches: list[list[str]] = []
+
+    async def run_batch(items: list[str]) -> list[str]:
+        batches.append(items)
+        return [item.upper() for item in items]
+
+    async def main() -> list:
+        batcher = KeyedBatcher(window=0.01)
+        return await asyncio.gather(*(batcher.submit("vm1", item, run_batch) for item in ("a", "b", "c")))
+
+    assert asyncio.run(main()) == ["A", "B", "C"]
+    assert batches == [["a", "b", "c"]]
+
+def test_max_size_and_keys_split_batches():
+    """Test a full batch is closed and different keys are never mixed."""
+    batches: list[list[str]] = []
+
+    async def run_batch(items: list[str]) -> list[str]:
+        batches.append(items)
+        return items
+
+    async def main() -> None:
+        batcher = KeyedBatcher(window=0.01, max_size=2)
+        await asyncio.gather(*(batcher.submit("vm1", item, run_batch) for item in ("a", "b", "c")),
+                             batcher.submit("vm2", "d", run_batch))
+
+    asyncio.run(main())
+    assert sorted(batches) == [["a", "b"], ["c"], ["d"]]
+
+def test_per_item_exception_reaches_only_its_submitter():
+    """Test an exception result is raised to its submitter while others get their result."""
+    async def run_batch(items: list[str]) -> list:
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    async def main() -> list:
+        batcher = KeyedBatcher(window=0.01)
+        return await asyncio.gather(batcher.submit("vm1", "ok", run_batch), batcher.submit("vm1", "bad", run_batch),
+                                    return_exceptions=True)
+
+    ok, bad = asyncio.run(main())
+    assert ok == "ok"
+    assert isinstance(bad, ValueError)
+
+def test_batch_failure_reaches_every_submitter():
+    """Test an error from run_batch is raised to all submitters of the batch."""
+    async def run_batch(items: list[str]) -> list:
+        raise RuntimeError("no free devices")
+
+    async def main() -> list:
+        batcher = KeyedBatcher(window=0.01)
+        return await asyncio.gather(*(batcher.submit("vm1", item, run_batch) for item in ("a", "b")),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) and str(result) == "no free devices" for result in results)
+    # Each submitter raises its own instance, so tracebacks are not shared
+    assert results[0] is not results[1]
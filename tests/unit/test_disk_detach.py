@@ -1,4 +1,5 @@
 import pytest
+import libvirt # type: ignore
 from unittest.mock import Mock, patch
 from src.services.disk_detach import _get_disk_source_path, poll_for_disk_removal, detach_disk
 
@@ -39,17 +40,20 @@ def test_get_disk_source_path_not_found(mock_parse_xml):
         _get_disk_source_path(mock_dom, 'vdb')
 
 @patch('src.services.disk_detach.time.sleep')
-@patch('src.services.disk_detach._get_disk_source_path')
-def test_poll_for_disk_removal_success(mock_get_source, mock_sleep):
+def test_poll_for_disk_removal_success(mock_sleep):
     """Test successful disk removal polling."""
     mock_dom = Mock()
     mock_dom.name.return_value = 'test_vm'
     
-    from src.utils.exceptions import DiskNotFound
-    mock_get_source.side_effect = DiskNotFound("Disk not found")
+    # blockInfo rejects a target device that is no longer attached
+    gone = libvirt.libvirtError("invalid path")
+    gone.get_error_code = lambda: libvirt.VIR_ERR_INVALID_ARG
+    mock_dom.blockInfo.side_effect = gone
     
     result = poll_for_disk_removal(mock_dom, 'vdb', timeout=1)
     assert result is True
+    mock_dom.blockInfo.assert_called_once_with('vdb')
+    mock_sleep.assert_not_called()
 
 @patch('src.services.disk_detach._validate_vm_for_detach')
 @patch('src.services.disk_detach._get_disk_source_path')
@@ -106,4 +110,21 @@ def test_detach_disk_all_methods_fail(mock_create_xml, mock_get_source, mock_val
     mock_dom.detachDeviceFlags.side_effect = libvirt.libvirtError('Failed with flags API')
     
     with pytest.raises(RuntimeError):
-        detach_disk(mock_conn, 'test_vm', 'vdb')
\ No newline at end of file
+        detach_disk(mock_conn, 'test_vm', 'vdb')
+
+
+@patch('src.services.disk_detach.time.sleep')
+def test_poll_for_disk_removal_backs_off(mock_sleep, monkeypatch):
+    """Test the poll interval grows by the backoff factor up to DISK_DETACH_POLL_INTERVAL."""
+    monkeypatch.setenv("DISK_DETACH_POLL_INITIAL", "0.01")
+    monkeypatch.setenv("DISK_DETACH_POLL_BACKOFF", "2")
+    monkeypatch.setenv("DISK_DETACH_POLL_INTERVAL", "0.03")
+    mock_dom = Mock()
+    mock_dom.name.return_value = 'test_vm'
+    # blockInfo succeeds while the disk is attached; removed on the fourth check
+    gone = libvirt.libvirtError("invalid path")
+    gone.get_error_code = lambda: libvirt.VIR_ERR_INVALID_ARG
+    mock_dom.blockInfo.side_effect = [None, None, None, gone]
+
+    assert poll_for_disk_removal(mock_dom, 'sdb', timeout=10)
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.01, 0.02, 0.03]
@@ -0,0 +1,16 @@
+from unittest.mock import Mock
+from src.services.disk_utils import list_vm_disks
+
+def test_list_vm_disks_only_file_disks_with_source():
+    """Test only file-backed disks with both a source and a target are listed."""
+    mock_dom = Mock()
+    mock_dom.name.return_value = 'test_vm'
+    mock_dom.UUIDString.return_value = 'uuid-list-disks'
+    mock_dom.XMLDesc.return_value = (
+        "<domain><devices>"
+        "<disk type='file'><source file='/pool/a.qcow2'/><target dev='sda' bus='scsi'/></disk>"
+        "<disk type='file'><target dev='sdb' bus='scsi'/></disk>"
+        "<disk type='block'><source dev='/dev/sdx'/><target dev='vda' bus='virtio'/></disk>"
+        "</devices></domain>"
+    )
+    assert list_vm_disks(mock_dom) == [{"target_dev": "sda", "source_file": "/pool/a.qcow2", "bus": "scsi"}]
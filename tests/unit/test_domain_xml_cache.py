@@ -0,0 +1,44 @@
+from unittest.mock import Mock
+from src.utils import domain_xml_cache
+from src.utils.domain_xml_cache import forget_domain_xml, parse_domain_xml
+
+def _mock_dom(uuid: str) -> Mock:
+    mock_dom = Mock()
+    mock_dom.name.return_value = 'test_vm'
+    mock_dom.UUIDString.return_value = uuid
+    mock_dom.ID.return_value = 1
+    mock_dom.XMLDesc.return_value = "<domain><devices/></domain>"
+    return mock_dom
+
+def test_uncached_read_fetches_again():
+    """Test every read fetches fresh XML."""
+    mock_dom = _mock_dom('uuid-fresh')
+    parse_domain_xml(mock_dom)
+    parse_domain_xml(mock_dom)
+    assert mock_dom.XMLDesc.call_count == 2
+
+def test_unchanged_xml_is_not_parsed_again():
+    """Test a fresh fetch of identical XML reuses the parsed tree, and changed XML is parsed."""
+    mock_dom = _mock_dom('uuid-unchanged')
+    root = parse_domain_xml(mock_dom)
+    assert parse_domain_xml(mock_dom) is root
+    mock_dom.XMLDesc.return_value = "<domain><devices><disk type='file'/></devices></domain>"
+    changed = parse_domain_xml(mock_dom)
+    assert changed is not root
+    assert len(changed.find("devices")) == 1
+    assert mock_dom.XMLDesc.call_count == 3
+
+def test_forgotten_domain_is_parsed_again():
+    """Test an undefined domain's stored document is dropped."""
+    mock_dom = _mock_dom('uuid-forget')
+    root = parse_domain_xml(mock_dom)
+    forget_domain_xml('uuid-forget')
+    assert parse_domain_xml(mock_dom) is not root
+
+def test_stored_documents_are_bounded(monkeypatch):
+    """Test the least recently used document is dropped beyond the size limit."""
+    monkeypatch.setattr(domain_xml_cache, "_XML_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(domain_xml_cache, "_XML_CACHE", domain_xml_cache.OrderedDict())
+    for uuid in ('uuid-a', 'uuid-b', 'uuid-c'):
+        parse_domain_xml(_mock_dom(uuid))
+    assert [key[0] for key in domain_xml_cache._XML_CACHE] == ['uuid-b', 'uuid-c']
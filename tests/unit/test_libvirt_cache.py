@@ -0,0 +1,116 @@
+import pytest
+import libvirt # type: ignore
+from unittest.mock import Mock
+from src.utils import libvirt_cache
+from src.utils.libvirt_cache import forget_connection, get_domain, get_domain_state, get_storage_pool, invalidate_domain
+
+@pytest.fixture(autouse=True)
+def domain_cache_ttl(monkeypatch):
+    monkeypatch.setenv("DOMAIN_CACHE_TTL", "30")
+    monkeypatch.setenv("DOMAIN_STATE_CACHE_TTL", "30")
+    monkeypatch.setenv("STORAGE_POOL_CACHE_TTL", "30")
+    yield
+    libvirt_cache._DOMAIN_CACHE.clear()
+    libvirt_cache._NAME_TO_UUID.clear()
+    libvirt_cache._STATE_CACHE.clear()
+    libvirt_cache._POOL_CACHE.clear()
+
+def _mock_dom(name: str) -> Mock:
+    mock_dom = Mock()
+    mock_dom.name.return_value = name
+    mock_dom.UUIDString.return_value = f"uuid-{name}"
+    return mock_dom
+
+def _mock_conn() -> Mock:
+    mock_conn = Mock()
+    mock_conn.lookupByName.side_effect = _mock_dom
+    return mock_conn
+
+def test_get_domain_reuses_lookup():
+    """Test repeated lookups of the same VM hit libvirt once."""
+    mock_conn = _mock_conn()
+    assert get_domain(mock_conn, 'vm1') is get_domain(mock_conn, 'vm1')
+    mock_conn.lookupByName.assert_called_once_with('vm1')
+
+def test_get_domain_expires(monkeypatch):
+    """Test a lookup is repeated once the TTL is zero."""
+    monkeypatch.setenv("DOMAIN_CACHE_TTL", "0")
+    mock_conn = _mock_conn()
+    get_domain(mock_conn, 'vm1')
+    get_domain(mock_conn, 'vm1')
+    assert mock_conn.lookupByName.call_count + mock_conn.lookupByUUIDString.call_count == 2
+
+def test_lifecycle_event_invalidates():
+    """Test an undefine event drops the cached lookup."""
+    mock_conn = _mock_conn()
+    get_domain(mock_conn, 'vm1')
+    event_dom = Mock()
+    event_dom.name.return_value = 'vm1'
+    libvirt_cache._on_lifecycle_event(mock_conn, event_dom, libvirt.VIR_DOMAIN_EVENT_UNDEFINED, 0, None)
+    get_domain(mock_conn, 'vm1')
+    assert mock_conn.lookupByName.call_count == 2
+
+def test_invalidate_domain_keeps_other_vms():
+    """Test invalidating one VM leaves other entries cached."""
+    mock_conn = _mock_conn()
+    get_domain(mock_conn, 'vm1')
+    get_domain(mock_conn, 'vm2')
+    invalidate_domain('vm1')
+    get_domain(mock_conn, 'vm2')
+    assert mock_conn.lookupByName.call_count == 2
+
+def test_expired_lookup_uses_uuid(monkeypatch):
+    """Test a repeated lookup goes through the VM's UUID."""
+    monkeypatch.setenv("DOMAIN_CACHE_TTL", "0")
+    mock_conn = _mock_conn()
+    get_domain(mock_conn, 'vm1')
+    get_domain(mock_conn, 'vm1')
+    mock_conn.lookupByName.assert_called_once_with('vm1')
+    mock_conn.lookupByUUIDString.assert_called_once_with('uuid-vm1')
+
+def test_stale_uuid_falls_back_to_name(monkeypatch):
+    """Test a VM that is gone under its old UUID is looked up by name again."""
+    monkeypatch.setenv("DOMAIN_CACHE_TTL", "0")
+    mock_conn = _mock_conn()
+    mock_conn.lookupByUUIDString.side_effect = libvirt.libvirtError("Domain not found")
+    mock_conn.lookupByUUIDString.side_effect.get_error_code = Mock(return_value=libvirt.VIR_ERR_NO_DOMAIN)
+    get_domain(mock_conn, 'vm1')
+    get_domain(mock_conn, 'vm1')
+    assert mock_conn.lookupByName.call_count == 2
+
+def test_domain_state_cached_until_lifecycle_event():
+    """Test the domain state is read once and re-read after a lifecycle event."""
+    mock_dom = _mock_dom('vm1')
+    mock_dom.state.return_value = [libvirt.VIR_DOMAIN_RUNNING, 1]
+    assert get_domain_state(mock_dom) == libvirt.VIR_DOMAIN_RUNNING
+    assert get_domain_state(mock_dom) == libvirt.VIR_DOMAIN_RUNNING
+    mock_dom.state.assert_called_once()
+
+    mock_dom.state.return_value = [libvirt.VIR_DOMAIN_SHUTOFF, 1]
+    libvirt_cache._on_lifecycle_event(Mock(), mock_dom, libvirt.VIR_DOMAIN_EVENT_STOPPED, 0, None)
+    assert get_domain_state(mock_dom) == libvirt.VIR_DOMAIN_SHUTOFF
+
+def test_storage_pool_reused_until_pool_event():
+    """Test a pool lookup is reused and dropped on a pool lifecycle event."""
+    mock_conn = _mock_conn()
+    pool = get_storage_pool(mock_conn, 'default')
+    assert get_storage_pool(mock_conn, 'default') is pool
+    mock_conn.storagePoolLookupByName.assert_called_once_with('default')
+
+    pool.name.return_value = 'default'
+    libvirt_cache._on_pool_lifecycle_event(mock_conn, pool, 0, 0, None)
+    get_storage_pool(mock_conn, 'default')
+    assert mock_conn.storagePoolLookupByName.call_count == 2
+
+def test_forget_connection_drops_its_lookups():
+    """Test closing a connection drops its cached lookups but keeps other connections'."""
+    closed_conn = _mock_conn()
+    other_conn = _mock_conn()
+    get_domain(closed_conn, 'vm1')
+    get_storage_pool(closed_conn, 'default')
+    other_dom = get_domain(other_conn, 'vm1')
+
+    forget_connection(closed_conn)
+    assert all(entry[0] is not closed_conn for entry in libvirt_cache._DOMAIN_CACHE.values())
+    assert all(entry[0] is not closed_conn for entry in libvirt_cache._POOL_CACHE.values())
+    assert get_domain(other_conn, 'vm1') is other_dom
@@ -0,0 +1,13 @@
+from unittest.mock import Mock
+from src.utils.libvirt_events import DeviceEventWaiter
+
+def test_waiter_with_alias_ignores_other_devices():
+    """Test only events for the waiter's alias wake it."""
+    mock_dom = Mock()
+    with DeviceEventWaiter(mock_dom, 0, alias='scsi0-0-0-1') as waiter:
+        assert waiter.registered
+        waiter._on_event(Mock(), mock_dom, 'scsi0-0-0-2', None)
+        assert not waiter.wait(0)
+        waiter._on_event(Mock(), mock_dom, 'scsi0-0-0-1', None)
+        assert waiter.wait(0)
+    mock_dom.connect.return_value.domainEventDeregisterAny.assert_called_once()
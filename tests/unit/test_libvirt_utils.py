@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+import libvirt # type: ignore
+from unittest.mock import Mock, patch
+from anyio import to_thread # type: ignore
+from src.utils.libvirt_utils import LibvirtPool, _letters_to_int, _int_to_letters, get_next_available_scsi_dev, get_next_available_scsi_devs
+
+def _mock_dom(*devs: str) -> Mock:
+    """Build a mock domain whose live XML contains SCSI disks with the given targets."""
+    disks = "".join(f"<disk type='file'><target dev='{dev}' bus='scsi'/></disk>" for dev in devs)
+    mock_dom = Mock()
+    mock_dom.name.return_value = 'test_vm'
+    mock_dom.UUIDString.return_value = f"uuid-{'-'.join(devs)}"
+    mock_dom.XMLDesc.return_value = f"<domain><devices>{disks}</devices></domain>"
+    return mock_dom
+
+@pytest.fixture(autouse=True)
+def max_scsi_devices(monkeypatch):
+    monkeypatch.setenv("MAX_SCSI_DEVICES", "26")
+
+def test_letters_round_trip():
+    """Test letter/integer conversion in both directions."""
+    for n in (0, 1, 25, 26, 27, 701, 702, 5000):
+        assert _letters_to_int(_int_to_letters(n)) == n
+    assert _int_to_letters(26) == 'aa'
+    assert _letters_to_int('z') == 25
+
+def test_next_scsi_dev_empty_vm():
+    """Test the first device is used when no SCSI disk is attached."""
+    assert get_next_available_scsi_dev(_mock_dom()) == 'sda'
+
+def test_next_scsi_dev_after_highest():
+    """Test the device after the highest one in use is returned."""
+    assert get_next_available_scsi_dev(_mock_dom('sda', 'sdc')) == 'sdd'
+
+def test_next_scsi_dev_fills_gap_when_last_slot_taken():
+    """Test a gap is reused once the last slot is occupied."""
+    assert get_next_available_scsi_dev(_mock_dom('sda', 'sdz')) == 'sdb'
+
+def test_next_scsi_devs_batch_prefers_tail_then_gaps():
+    """Test a batch allocation uses slots after the highest device, then gaps."""
+    assert get_next_available_scsi_devs(_mock_dom('sda', 'sdc', 'sdy'), 3) == ['sdz', 'sdb', 'sdd']
+
+def test_next_scsi_dev_exhausted(monkeypatch):
+    """Test an error is raised when every slot is in use."""
+    monkeypatch.setenv("MAX_SCSI_DEVICES", "2")
+    with pytest.raises(RuntimeError):
+        get_next_available_scsi_dev(_mock_dom('sda', 'sdb'))
+
+def _mock_conn(alive: bool = True) -> Mock:
+    mock_conn = Mock()
+    mock_conn.isAlive.return_value = alive
+    return mock_conn
+
+def test_pool_reuses_released_connection():
+    """Test a released connection is handed out again instead of reconnecting."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn) as mock_open:
+        pool = LibvirtPool(min_size=1, max_size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+        assert pool.acquire() is conn
+        mock_open.assert_called_once()
+
+def test_pool_replaces_dead_connection():
+    """Test a connection that is no longer alive is closed and replaced."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=1, max_size=1)
+        conn = pool.acquire()
+        conn.isAlive.return_value = False
+        pool.release(conn)
+        assert pool.acquire() is not conn
+        conn.close.assert_called_once()
+
+def test_pool_acquire_times_out_when_exhausted():
+    """Test acquire fails once max_size connections are in use."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=1, max_size=1, acquire_timeout=0.01)
+        pool.acquire()
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+def test_pool_acquire_async_waits_without_a_thread():
+    """Test a request waiting for a connection does not hold a threadpool token."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=1, max_size=1)
+
+        async def main() -> None:
+            to_thread.current_default_thread_limiter().total_tokens = 1
+            conn = await pool.acquire_async()
+            waiting = asyncio.ensure_future(pool.acquire_async())
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+            # The only worker thread is still free for the connection holder
+            assert await to_thread.run_sync(conn.getVersion) is not None
+            await pool.release_async(conn)
+            assert await waiting is conn
+
+        asyncio.run(main())
+
+def test_pool_acquire_async_times_out_when_exhausted():
+    """Test acquire_async fails once max_size connections are in use."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=1, max_size=1, acquire_timeout=0.01)
+
+        async def main() -> None:
+            await pool.acquire_async()
+            with pytest.raises(RuntimeError):
+                await pool.acquire_async()
+
+        asyncio.run(main())
+
+def test_pool_release_async_returns_slot_to_its_own_loop():
+    """Test a connection taken on an old event loop does not add a slot to the new loop's semaphore."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=1, max_size=2)
+        old_conn = asyncio.run(pool.acquire_async())
+
+        async def main() -> None:
+            conn = await pool.acquire_async()
+            await pool.release_async(old_conn)
+            other_conn = await pool.acquire_async()
+            # Both of this loop's max_size slots are taken
+            assert pool._loop_slots().locked()
+            await pool.release_async(conn)
+            await pool.release_async(other_conn)
+
+        asyncio.run(main())
+
+def test_pool_prefill_opens_min_size():
+    """Test prefill opens connections up to min_size and they are reused."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn) as mock_open:
+        pool = LibvirtPool(min_size=2, max_size=4)
+        assert pool.prefill() == 2
+        assert pool.prefill() == 0
+        pool.acquire()
+        pool.acquire()
+        assert mock_open.call_count == 2
+
+def test_pool_check_idle_evicts_stale_connection():
+    """Test idle connections failing getVersion are closed and dropped."""
+    with patch('src.utils.libvirt_utils.get_libvirt_connection', side_effect=_mock_conn):
+        pool = LibvirtPool(min_size=2, max_size=2)
+        pool.prefill()
+        stale = pool.acquire()
+        stale.getVersion.side_effect = libvirt.libvirtError("connection reset")
+        pool.release(stale)
+        assert pool.check_idle() == 1
+        stale.close.assert_called_once()
+        assert pool.acquire() is not stale
+
+def test_next_scsi_dev_uses_given_root():
+    """Test an already-parsed tree is used instead of reading the domain XML."""
+    from lxml import etree # type: ignore
+    mock_dom = _mock_dom()
+    root = etree.fromstring("<domain><devices><disk type='file'><target dev='sda' bus='scsi'/></disk></devices></domain>")
+    assert get_next_available_scsi_dev(mock_dom, root=root) == 'sdb'
+    mock_dom.XMLDesc.assert_not_called()
+
+def test_next_scsi_devs_fills_gaps_lowest_first():
+    """Test gaps are handed out lowest first once the tail is used up."""
+    assert get_next_available_scsi_devs(_mock_dom('sdb', 'sdd', 'sdf', 'sdz'), 3) == ['sda', 'sdc', 'sde']
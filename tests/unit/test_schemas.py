@@ -0,0 +1,29 @@
+import pytest
+from pydantic import ValidationError # type: ignore
+from src.schemas.base_schemas import BaseVolumeRequest
+from src.schemas.batch_disk_request import BatchAttachDiskRequest, BatchDetachDiskRequest
+from src.schemas.create_vm_request import CreateVMRequest
+from src.schemas.create_volume_request import CreateVolumeRequest
+
+def test_shared_field_types_keep_validator_messages():
+    """Test the Annotated field types report the validation_utils messages."""
+    with pytest.raises(ValidationError, match="Name must contain only"):
+        BatchAttachDiskRequest(vm_name='vm1', disks=[{'qcow2_path': '/pool/a.qcow2', 'disk_name': 'bad name'}])
+    with pytest.raises(ValidationError, match="Disk path must end with .qcow2"):
+        BatchAttachDiskRequest(vm_name='vm1', disks=[{'qcow2_path': '/pool/a.raw', 'disk_name': 'a'}])
+    with pytest.raises(ValidationError, match="Target device must follow format"):
+        BatchDetachDiskRequest(vm_name='vm1', target_devs=['sdb', 'hda'])
+
+def test_name_field_types_keep_field_specific_messages():
+    """Test the VM, pool, volume, network and backing volume name types report which field is invalid."""
+    with pytest.raises(ValidationError, match="VM name must contain only"):
+        BatchDetachDiskRequest(vm_name='bad vm', target_devs=['sdb'])
+    with pytest.raises(ValidationError, match="Storage pool name must contain only"):
+        BaseVolumeRequest(pool_name='bad pool', volume_name='vol1')
+    with pytest.raises(ValidationError, match="Volume name must contain only"):
+        BaseVolumeRequest(pool_name='default', volume_name='bad/vol')
+    with pytest.raises(ValidationError, match="Network name must be a valid identifier"):
+        CreateVMRequest(vm_name='vm1', memory_mb=512, vcpu_count=1, disk_path='/pool/a.qcow2', network_name='bad-net')
+    with pytest.raises(ValidationError, match="Backing volume name must contain only"):
+        CreateVolumeRequest(size_gb=1, backing_vol_name='bad vol')
+    assert CreateVolumeRequest(size_gb=1).backing_vol_name is None
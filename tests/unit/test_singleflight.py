@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from src.utils.singleflight import SingleFlight
+
+def test_concurrent_calls_are_coalesced():
+    """Test overlapping calls with the same key run the work once."""
+    calls: list[str] = []
+
+    async def work() -> list[str]:
+        calls.append("run")
+        await asyncio.sleep(0.01)
+        return ["sda"]
+
+    async def main() -> list:
+        singleflight = SingleFlight()
+        return await asyncio.gather(*(singleflight.do(("list", "vm1"), work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == ["run"]
+    assert all(result == ["sda"] for result in results)
+
+def test_different_keys_run_separately():
+    """Test calls with different keys are not coalesced."""
+    calls: list[str] = []
+
+    async def main() -> None:
+        singleflight = SingleFlight()
+
+        async def work(name: str) -> str:
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return name
+
+        await asyncio.gather(singleflight.do("vm1", lambda: work("vm1")), singleflight.do("vm2", lambda: work("vm2")))
+
+    asyncio.run(main())
+    assert sorted(calls) == ["vm1", "vm2"]
+
+def test_exception_is_shared_and_not_cached():
+    """Test waiters get the error and a later call runs again."""
+    calls: list[str] = []
+
+    async def failing() -> None:
+        calls.append("run")
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main() -> list:
+        singleflight = SingleFlight()
+        results = await asyncio.gather(*(singleflight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await singleflight.do("key", failing)
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == ["run", "run"]
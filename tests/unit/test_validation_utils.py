@@ -0,0 +1,11 @@
+import pytest
+from src.utils.validation_utils import validate_name, validate_target_device
+
+def test_name_and_target_device_reject_trailing_newline():
+    """Test the whole value must match, including no trailing newline."""
+    assert validate_name("vm-1.test_a") == "vm-1.test_a"
+    assert validate_target_device("sdb") == "sdb"
+    with pytest.raises(ValueError):
+        validate_name("vm1\n")
+    with pytest.raises(ValueError):
+        validate_target_device("sdb\n")
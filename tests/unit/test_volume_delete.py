@@ -0,0 +1,45 @@
+import pytest
+import libvirt # type: ignore
+from unittest.mock import Mock
+from src.services.volume_delete import delete_volume
+from src.utils.exceptions import VolumeInUseError
+
+def _mock_conn(*sources: str) -> Mock:
+    """Build a mock connection with one pool volume and one VM using the given disk sources."""
+    disks = "".join(f"<disk type='file'><source file='{src}'/><target dev='sd{chr(97 + i)}'/></disk>"
+                    for i, src in enumerate(sources))
+    mock_dom = Mock()
+    mock_dom.name.return_value = 'test_vm'
+    mock_dom.XMLDesc.return_value = f"<domain><devices><emulator>/usr/bin/qemu</emulator>{disks}<interface type='network'/></devices></domain>"
+    mock_vol = Mock()
+    mock_vol.path.return_value = '/pool/vol.qcow2'
+    mock_conn = Mock()
+    mock_conn.storagePoolLookupByName.return_value.storageVolLookupByName.return_value = mock_vol
+    mock_conn.listAllDomains.return_value = [mock_dom]
+    # Running VM whose live disks are not in use: its persistent XML is checked
+    mock_conn.getAllDomainStats.return_value = [(mock_dom, {"state.state": libvirt.VIR_DOMAIN_RUNNING, "block.count": 0})]
+    return mock_conn
+
+def test_delete_volume_in_use():
+    """Test a volume attached to a VM is not deleted."""
+    mock_conn = _mock_conn('/pool/other.qcow2', '/pool/vol.qcow2')
+    with pytest.raises(VolumeInUseError):
+        delete_volume(mock_conn, 'default', 'vol.qcow2')
+    mock_conn.storagePoolLookupByName.return_value.storageVolLookupByName.return_value.delete.assert_not_called()
+
+def test_delete_volume_not_in_use():
+    """Test a volume not attached to any VM is deleted."""
+    mock_conn = _mock_conn('/pool/other.qcow2')
+    delete_volume(mock_conn, 'default', 'vol.qcow2')
+    mock_conn.storagePoolLookupByName.return_value.storageVolLookupByName.return_value.delete.assert_called_once()
+
+def test_delete_volume_in_use_by_shutoff_vm_from_stats():
+    """Test block stats of a shut-off VM are enough to find the volume in use."""
+    mock_conn = _mock_conn()
+    mock_dom = mock_conn.listAllDomains.return_value[0]
+    mock_conn.getAllDomainStats.return_value = [
+        (mock_dom, {"state.state": libvirt.VIR_DOMAIN_SHUTOFF, "block.count": 1, "block.0.path": '/pool/vol.qcow2'}),
+    ]
+    with pytest.raises(VolumeInUseError):
+        delete_volume(mock_conn, 'default', 'vol.qcow2')
+    mock_dom.XMLDesc.assert_not_called()